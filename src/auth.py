@@ -1,5 +1,6 @@
 from nicegui import ui, app
-from src.database import User, get_session
+from src.database import User, get_session, session_scope
+import asyncio
 import functools
 
 def get_current_user():
@@ -13,22 +14,33 @@ def get_current_user():
         except (KeyError, TypeError):
             return None
         
-        session = get_session()
-        try:
-            return session.query(User).filter_by(username=username).first()
-        finally:
-            session.close()
+        # Within a request the user is looked up once (by the auth middleware)
+        # and kept on the request's session for every later call
+        with session_scope() as session:
+            user = session.info.get('current_user')
+            if user is None or user.username != username:
+                user = session.get(User, username)
+                session.info['current_user'] = user
+            return user
     except (AttributeError, RuntimeError):
         # Handle case when app.storage.user is not available
         return None
 
 def login_required(func):
-    """Decorator to ensure user is logged in before accessing a page"""
+    """Decorator to ensure user is logged in before accessing a page (sync or async)"""
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            if get_current_user() is None:
+                ui.navigate.to('/login')
+                return
+            return await func(*args, **kwargs)
+        return async_wrapper
+    
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         if get_current_user() is None:
-            # Use JavaScript to navigate
-            ui.run_javascript(f"window.location.href = '/login'")
+            ui.navigate.to('/login')
             return
         return func(*args, **kwargs)
     return wrapper
@@ -48,8 +60,7 @@ async def login(username, password):
 
 def logout():
     """Log out the current user"""
-    # Use JavaScript to navigate
-    ui.run_javascript(f"window.location.href = '/login'")
+    ui.navigate.to('/login')
 
 async def register(username, password):
     """Register a new user"""
@@ -80,21 +91,20 @@ async def update_api_key(api_key):
     if current_user is None:
         return False, "Not logged in"
     
-    session = get_session()
-    try:
-        user = session.query(User).filter_by(username=current_user.username).first()
-        if not user:
-            return False, "User not found"
-        
-        user.elab_api_key = api_key
-        session.commit()
-        
-        return True, "API key updated successfully"
-    except Exception as e:
-        session.rollback()
-        return False, f"Error: {str(e)}"
-    finally:
-        session.close()
+    # Same session as get_current_user, so its cached user sees the new key
+    with session_scope() as session:
+        try:
+            user = session.get(User, current_user.username)
+            if not user:
+                return False, "User not found"
+            
+            user.elab_api_key = api_key
+            session.commit()
+            
+            return True, "API key updated successfully"
+        except Exception as e:
+            session.rollback()
+            return False, f"Error: {str(e)}"
 
 def get_current_user_api_key():
     """Get the API key for the current user"""
@@ -132,8 +142,7 @@ def create_login_ui():
                     # Store username in session
                     app.storage.user['username'] = user_name
                     ui.notify('Login successful', color='positive')
-                    # Use JavaScript to navigate
-                    ui.run_javascript(f"window.location.href = '/'")
+                    ui.navigate.to('/')
                 else:
                     status_label.text = 'Invalid username or password'
             except Exception as e:
@@ -148,8 +157,7 @@ def create_login_ui():
         ui.label('New User?').classes('text-center')
         
         def go_to_register():
-            # Use JavaScript to navigate
-            ui.run_javascript(f"window.location.href = '/register'")
+            ui.navigate.to('/register')
         
         ui.button('Register', on_click=go_to_register).classes('w-full')
 
@@ -185,8 +193,7 @@ def create_register_ui():
                 success, message = await register(username.value, password.value)
                 if success:
                     ui.notify(message, color='positive')
-                    # Use JavaScript to navigate
-                    ui.run_javascript(f"window.location.href = '/login'")
+                    ui.navigate.to('/login')
                 else:
                     status_label.text = message
             except Exception as e:
@@ -199,8 +206,7 @@ def create_register_ui():
         ui.separator()
         
         def go_to_login():
-            # Use JavaScript to navigate
-            ui.run_javascript(f"window.location.href = '/login'")
+            ui.navigate.to('/login')
         
         ui.button('Back to Login', on_click=go_to_login).classes('w-full')
 
@@ -233,7 +239,6 @@ def create_api_key_ui():
         ui.separator()
         
         def go_to_dashboard():
-            # Use JavaScript to navigate
-            ui.run_javascript(f"window.location.href = '/'")
+            ui.navigate.to('/')
         
         ui.button('Back to Dashboard', on_click=go_to_dashboard).classes('w-full')
@@ -1,7 +1,11 @@
 import os
+import itertools
+import contextvars
+from contextlib import contextmanager
+from functools import lru_cache
 import sqlalchemy as sa
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import Session, sessionmaker, scoped_session, relationship
 from datetime import datetime
 from passlib.hash import pbkdf2_sha256
 
@@ -33,9 +37,11 @@ class Experiment(Base):
     
     id = sa.Column(sa.Integer, primary_key=True)
     title = sa.Column(sa.String, nullable=False)
-    user_id = sa.Column(sa.String, sa.ForeignKey('users.username'), nullable=False)
+    user_id = sa.Column(sa.String, sa.ForeignKey('users.username'), nullable=False, index=True)
     created_at = sa.Column(sa.DateTime, default=datetime.utcnow)
+    updated_at = sa.Column(sa.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True)
     elab_id = sa.Column(sa.Integer, nullable=True)
+    elab_html_hash = sa.Column(sa.String(64), nullable=True)  # Hash of the report last sent to eLabFTW
     status = sa.Column(sa.String, default="Planning", nullable=False)
     notes = sa.Column(sa.String, nullable=True)
     current_timepoint_id = sa.Column(sa.Integer, sa.ForeignKey('timepoints.id'), nullable=True)
@@ -49,7 +55,7 @@ class Timepoint(Base):
     __tablename__ = 'timepoints'
     
     id = sa.Column(sa.Integer, primary_key=True)
-    experiment_id = sa.Column(sa.Integer, sa.ForeignKey('experiments.id'), nullable=False)
+    experiment_id = sa.Column(sa.Integer, sa.ForeignKey('experiments.id'), nullable=False, index=True)
     name = sa.Column(sa.String, nullable=False)  # e.g., "t0", "t4", etc.
     hours = sa.Column(sa.Float, nullable=False)  # e.g., 0, 4, 7, 11
     description = sa.Column(sa.String, nullable=True)
@@ -60,6 +66,10 @@ class Timepoint(Base):
 
 class Batch(Base):
     __tablename__ = 'batches'
+    # Covers lookups by experiment as well as the per-experiment status queries
+    __table_args__ = (
+        sa.Index('ix_batches_experiment_id_status', 'experiment_id', 'status'),
+    )
     
     id = sa.Column(sa.Integer, primary_key=True)
     experiment_id = sa.Column(sa.Integer, sa.ForeignKey('experiments.id'), nullable=False)
@@ -80,9 +90,13 @@ class Batch(Base):
 
 class Measurement(Base):
     __tablename__ = 'measurements'
+    # Measurements are looked up per timepoint, per batch, or both
+    __table_args__ = (
+        sa.Index('ix_measurements_timepoint_id_batch_id', 'timepoint_id', 'batch_id'),
+    )
     
     id = sa.Column(sa.Integer, primary_key=True)
-    batch_id = sa.Column(sa.Integer, sa.ForeignKey('batches.id'), nullable=False)
+    batch_id = sa.Column(sa.Integer, sa.ForeignKey('batches.id'), nullable=False, index=True)
     timepoint_id = sa.Column(sa.Integer, sa.ForeignKey('timepoints.id'), nullable=False)
     ph_value = sa.Column(sa.Float, nullable=True)
     ph_sample_time = sa.Column(sa.DateTime, nullable=True)  # timestamp when pH sample was collected
@@ -98,20 +112,119 @@ class Measurement(Base):
     batch = relationship("Batch", back_populates="measurements")
     timepoint = relationship("Timepoint", back_populates="measurements")
 
+# Cached eLabFTW reports (see get_experiment_html) are only rebuilt when updated_at
+# changes. Core insert()/update()/delete() statements on batches, timepoints or
+# measurements bypass this listener, so they must bump Experiment.updated_at
+# themselves (as mark_all_batches_completed does).
+@sa.event.listens_for(Session, 'before_flush')
+def touch_changed_experiments(session, flush_context, instances):
+    """Bump updated_at of experiments whose batches, timepoints or measurements change"""
+    experiment_ids = set()
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, (Batch, Timepoint)):
+            experiment_ids.add(obj.experiment_id)
+        elif isinstance(obj, Measurement):
+            timepoint = session.get(Timepoint, obj.timepoint_id)
+            if timepoint:
+                experiment_ids.add(timepoint.experiment_id)
+    
+    now = datetime.utcnow()
+    for experiment_id in experiment_ids:
+        experiment = session.get(Experiment, experiment_id) if experiment_id else None
+        if experiment and experiment not in session.deleted:
+            experiment.updated_at = now
+
 # Database setup
+@lru_cache(maxsize=None)
 def get_engine(db_path='data/kombucha_eln.db'):
-    """Create and return a SQLAlchemy engine"""
+    """Create (once per database path) and return a SQLAlchemy engine"""
     full_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', db_path)
-    return sa.create_engine(f'sqlite:///{full_path}')
+    engine = sa.create_engine(f'sqlite:///{full_path}')
+
+    @sa.event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL lets page reads proceed while another request is writing, and
+        # NORMAL sync is safe in WAL mode while saving an fsync per commit
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+    return engine
 
 def setup_database():
-    """Create all tables if they don't exist"""
+    """Create all tables (and, for new tables, their indexes) if they don't exist"""
     engine = get_engine()
     Base.metadata.create_all(engine)
     return engine
 
+def create_indexes():
+    """
+    Create the model indexes missing from an existing database.
+    create_all skips existing tables entirely, so indexes added to a model later
+    on have to be created separately. Run after the migrations, since an index
+    may cover a column they add.
+    """
+    engine = get_engine()
+    for table in Base.metadata.tables.values():
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+@lru_cache(maxsize=None)
+def get_sessionmaker():
+    """Return the session factory bound to the application engine"""
+    return sessionmaker(bind=get_engine())
+
 def get_session():
     """Create and return a new session"""
-    engine = get_engine()
-    Session = sessionmaker(bind=engine)
-    return Session()
+    return get_sessionmaker()()
+
+# Identifies the HTTP request being handled (None outside of requests)
+_request_id = contextvars.ContextVar('request_id', default=None)
+_request_counter = itertools.count(1)
+
+# Requests whose scope is still open. Tasks started during a request (e.g. async
+# pages continuing after the response) inherit its request ID but must not use
+# its session once the scope has ended.
+_active_requests = set()
+
+# One session per request, shared by every session_scope() within it. Objects are
+# not expired on commit so they stay usable after the request's session is closed.
+RequestSession = scoped_session(
+    lambda: get_sessionmaker()(expire_on_commit=False),
+    scopefunc=_request_id.get
+)
+
+@contextmanager
+def request_scope():
+    """
+    Share a single session between all database calls made until the
+    scope exits, then close it. Used by the HTTP middleware around each request.
+    """
+    request_id = next(_request_counter)
+    token = _request_id.set(request_id)
+    _active_requests.add(request_id)
+    try:
+        yield
+    finally:
+        _active_requests.discard(request_id)
+        RequestSession.remove()
+        _request_id.reset(token)
+
+@contextmanager
+def session_scope():
+    """
+    Provide a session for a unit of database work.
+    Inside a request this is the request's shared session, which stays open
+    until the request ends; otherwise (e.g. in event handlers) it is a new
+    session that is closed on exit.
+    """
+    if _request_id.get() in _active_requests:
+        yield RequestSession()
+        return
+    
+    session = get_session()
+    try:
+        yield session
+    finally:
+        session.close()
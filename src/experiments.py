@@ -1,37 +1,49 @@
-from nicegui import ui
-from src.database import Experiment, Batch, get_session
+from nicegui import ui, run, background_tasks
+from src.database import Experiment, Batch, session_scope
 from src.auth import get_current_user, login_required
-from src.templates import generate_experiment_html, generate_batch_dict_from_db_batch
+from src.templates import generate_experiment_html, generate_batch_dicts_bulk
 from src.elab_api import create_and_update_experiment, initialize_api_client
 from src.timepoints import get_experiment_timepoints
 from elabapi_python.rest import ApiException
+from sqlalchemy import select, insert, update, func, inspect, lambda_stmt
+from sqlalchemy.orm import selectinload
+import asyncio
 import datetime
+from collections import OrderedDict
+import functools
+import hashlib
+
+# Seconds without typing before experiment notes are saved automatically
+NOTES_AUTOSAVE_DELAY = 0.5
+
+# Names of the mapped columns, for checking which keyword arguments can be written to a row
+EXPERIMENT_COLUMNS = frozenset(attr.key for attr in inspect(Experiment).column_attrs)
+BATCH_COLUMNS = frozenset(attr.key for attr in inspect(Batch).column_attrs)
 
 # Function to delete an experiment
 async def delete_experiment(experiment_id):
-    session = get_session()
-    try:
-        experiment = session.query(Experiment).filter_by(id=experiment_id).first()
-        if not experiment:
-            ui.notify('Experiment not found', color='negative')
-            return False
+    with session_scope() as session:
+        try:
+            experiment = session.query(Experiment).filter_by(id=experiment_id).first()
+            if not experiment:
+                ui.notify('Experiment not found', color='negative')
+                return False
 
-        # Delete all batches associated with this experiment
-        session.query(Batch).filter_by(experiment_id=experiment_id).delete()
+            # Delete all batches associated with this experiment
+            session.query(Batch).filter_by(experiment_id=experiment_id).delete()
         
-        # Delete the experiment
-        session.delete(experiment)
-        session.commit()
+            # Delete the experiment
+            session.delete(experiment)
+            session.commit()
+            _experiment_html_cache.pop(experiment_id, None)
 
-        ui.notify('Experiment deleted successfully', color='positive')
-        ui.run_javascript("window.location.href = '/'")
-        return True
-    except Exception as e:
-        session.rollback()
-        ui.notify(f"Error deleting experiment: {str(e)}", color='negative')
-        return False
-    finally:
-        session.close()
+            ui.notify('Experiment deleted successfully', color='positive')
+            ui.navigate.to('/')
+            return True
+        except Exception as e:
+            session.rollback()
+            ui.notify(f"Error deleting experiment: {str(e)}", color='negative')
+            return False
 
 def open_experiment_delete_dialog(experiment_id, experiment_title):
     with ui.dialog() as dialog, ui.card():
@@ -49,64 +61,66 @@ def open_experiment_delete_dialog(experiment_id, experiment_title):
         dialog.open()
 
 # New function to duplicate a batch
-async def duplicate_batch(batch_id):
-    session = get_session()
-    try:
-        original = session.query(Batch).filter_by(id=batch_id).first()
-        if not original:
-            ui.notify('Original batch not found', color='negative')
-            return
+async def duplicate_batch(batch_id, on_change=None):
+    with session_scope() as session:
+        try:
+            original = session.query(Batch).filter_by(id=batch_id).first()
+            if not original:
+                ui.notify('Original batch not found', color='negative')
+                return
 
-        new_batch = Batch(
-            experiment_id=original.experiment_id,
-            name=f'{original.name} (Copy)',
-            status='Setup',
-            tea_type=original.tea_type,
-            tea_concentration=original.tea_concentration,
-            water_amount=original.water_amount,
-            sugar_type=original.sugar_type,
-            sugar_concentration=original.sugar_concentration,
-            inoculum_concentration=original.inoculum_concentration,
-            temperature=original.temperature,
-        )
+            new_batch = Batch(
+                experiment_id=original.experiment_id,
+                name=f'{original.name} (Copy)',
+                status='Setup',
+                tea_type=original.tea_type,
+                tea_concentration=original.tea_concentration,
+                water_amount=original.water_amount,
+                sugar_type=original.sugar_type,
+                sugar_concentration=original.sugar_concentration,
+                inoculum_concentration=original.inoculum_concentration,
+                temperature=original.temperature,
+            )
 
-        session.add(new_batch)
-        session.commit()
+            session.add(new_batch)
+            session.commit()
 
-        ui.notify('Batch duplicated successfully', color='positive')
-        ui.run_javascript("window.location.reload()")
-    except Exception as e:
-        session.rollback()
-        ui.notify(f"Error duplicating batch: {str(e)}", color='negative')
-    finally:
-        session.close()
+            ui.notify('Batch duplicated successfully', color='positive')
+            if on_change:
+                on_change()
+            else:
+                ui.run_javascript("window.location.reload()")
+        except Exception as e:
+            session.rollback()
+            ui.notify(f"Error duplicating batch: {str(e)}", color='negative')
 
 # Function to delete a batch
-async def delete_batch(batch_id):
-    session = get_session()
-    try:
-        batch = session.query(Batch).filter_by(id=batch_id).first()
-        if not batch:
-            ui.notify('Batch not found', color='negative')
-            return
+async def delete_batch(batch_id, on_change=None):
+    with session_scope() as session:
+        try:
+            batch = session.query(Batch).filter_by(id=batch_id).first()
+            if not batch:
+                ui.notify('Batch not found', color='negative')
+                return
 
-        session.delete(batch)
-        session.commit()
+            session.delete(batch)
+            session.commit()
 
-        ui.notify('Batch deleted successfully', color='positive')
-        ui.run_javascript("window.location.reload()")
-    except Exception as e:
-        session.rollback()
-        ui.notify(f"Error deleting batch: {str(e)}", color='negative')
-    finally:
-        session.close()
+            ui.notify('Batch deleted successfully', color='positive')
+            if on_change:
+                on_change()
+            else:
+                ui.run_javascript("window.location.reload()")
+        except Exception as e:
+            session.rollback()
+            ui.notify(f"Error deleting batch: {str(e)}", color='negative')
 
-def open_delete_dialog(batch_id, batch_name):
+def open_delete_dialog(batch_id, batch_name, on_change=None):
     with ui.dialog() as dialog, ui.card():
         ui.label(f"Are you sure you want to delete {batch_name}?").classes("text-lg")
 
         async def confirm_delete():
-            await delete_batch(batch_id)
+            await delete_batch(batch_id, on_change)
             dialog.close()
 
         with ui.row().classes("justify-end w-full"):
@@ -130,71 +144,190 @@ async def create_experiment(title, num_batches):
     if current_user is None:
         return None
     
-    session = get_session()
-    try:
-        # Create experiment
-        experiment = Experiment(
-            title=title,
-            user_id=current_user.username,
-            created_at=datetime.datetime.utcnow(),
-            status="Planning"
-        )
-        
-        session.add(experiment)
-        session.flush()  # Get the experiment ID
+    with session_scope() as session:
+        try:
+            # Create experiment and get its ID back from the same INSERT
+            experiment_id = session.execute(
+                insert(Experiment).returning(Experiment.id),
+                {
+                    'title': title,
+                    'user_id': current_user.username,
+                    'created_at': datetime.datetime.utcnow(),
+                    'status': "Planning"
+                }
+            ).scalar_one()
         
-        # Create empty batches
-        for i in range(num_batches):
-            batch = Batch(
-                experiment_id=experiment.id,
-                name=f"Batch {i+1}",
-                status="Setup"
-            )
-            session.add(batch)
+            # Create empty batches in a single executemany
+            if num_batches > 0:
+                session.execute(
+                    insert(Batch),
+                    [
+                        {'experiment_id': experiment_id, 'name': f"Batch {i+1}", 'status': "Setup"}
+                        for i in range(num_batches)
+                    ]
+                )
         
-        session.commit()
-        return experiment.id
-    except Exception as e:
-        session.rollback()
-        ui.notify(f"Error creating experiment: {str(e)}", color='negative')
-        return None
-    finally:
-        session.close()
+            session.commit()
+            return experiment_id
+        except Exception as e:
+            session.rollback()
+            ui.notify(f"Error creating experiment: {str(e)}", color='negative')
+            return None
+
+# Columns needed to display an experiment without loading the full row (e.g. notes)
+EXPERIMENT_SUMMARY_COLUMNS = (
+    Experiment.id,
+    Experiment.title,
+    Experiment.status,
+    Experiment.elab_id,
+    Experiment.created_at
+)
+
+# Label color for each experiment status in the experiment list
+EXPERIMENT_STATUS_COLORS = {
+    'Planning': 'blue',
+    'Running': 'orange',
+    'Analysis': 'purple',
+    'Completed': 'green'
+}
+
+# Ordering for each sort option of the experiment list; id keeps pages stable on ties
+EXPERIMENT_SORT_ORDERS = {
+    'newest': (Experiment.created_at.desc(), Experiment.id.desc()),
+    'oldest': (Experiment.created_at.asc(), Experiment.id.asc()),
+    'title_asc': (func.lower(Experiment.title).asc(), Experiment.id.asc()),
+    'title_desc': (func.lower(Experiment.title).desc(), Experiment.id.desc()),
+}
 
-def get_user_experiments():
+def get_user_experiments(page=0, page_size=20, status=None, sort='newest'):
     """
-    Get all experiments for the current user
+    Get one page of experiment summaries for the current user
+    
+    Args:
+        page: The zero-based page number
+        page_size: The number of experiments per page
+        status: Only return experiments with this status (None or 'All' for all)
+        sort: One of 'newest', 'oldest', 'title_asc' or 'title_desc'
     
     Returns:
-        A list of experiment objects
+        A list of rows with id, title, status, elab_id and created_at
     """
     current_user = get_current_user()
     if current_user is None:
         return []
     
-    session = get_session()
-    try:
-        experiments = session.query(Experiment).filter_by(user_id=current_user.username).all()
+    with session_scope() as session:
+        query = session.query(*EXPERIMENT_SUMMARY_COLUMNS).filter_by(user_id=current_user.username)
+        if status and status != 'All':
+            query = query.filter(Experiment.status == status)
+        
+        experiments = (
+            query.order_by(*EXPERIMENT_SORT_ORDERS.get(sort, EXPERIMENT_SORT_ORDERS['newest']))
+            .limit(page_size)
+            .offset(page * page_size)
+            .all()
+        )
         return experiments
-    finally:
-        session.close()
 
-def get_experiment(experiment_id):
+def get_batch_counts(experiment_ids):
+    """
+    Count the batches of several experiments in one query
+    
+    Args:
+        experiment_ids: The IDs of the experiments
+    
+    Returns:
+        A dict mapping experiment ID to its number of batches (missing if none)
+    """
+    if not experiment_ids:
+        return {}
+    
+    with session_scope() as session:
+        counts = (
+            session.query(Batch.experiment_id, func.count(Batch.id))
+            .filter(Batch.experiment_id.in_(experiment_ids))
+            .group_by(Batch.experiment_id)
+            .all()
+        )
+        return dict(counts)
+
+def get_experiment_list_rows(page=0, page_size=20, status=None, sort='newest'):
+    """
+    Get the values shown on the cards of one page of the current user's experiment list.
+    Pages are cached until any of the user's experiments changes.
+    
+    Args:
+        page: The zero-based page number
+        page_size: The number of experiments per page
+        status: Only return experiments with this status (None or 'All' for all)
+        sort: One of 'newest', 'oldest', 'title_asc' or 'title_desc'
+    
+    Returns:
+        A tuple of dicts with the display values of each experiment
+    """
+    current_user = get_current_user()
+    if current_user is None:
+        return ()
+    
+    # Any change to an experiment or its batches bumps updated_at; the count catches deletions
+    with session_scope() as session:
+        stamp = tuple(
+            session.query(func.max(Experiment.updated_at), func.count(Experiment.id))
+            .filter(Experiment.user_id == current_user.username)
+            .one()
+        )
+    return _build_experiment_list_rows(current_user.username, stamp, page, page_size, status, sort)
+
+@functools.lru_cache(maxsize=64)
+def _build_experiment_list_rows(username, stamp, page, page_size, status, sort):
+    """Build the experiment list rows for a user; username and stamp only key the cache"""
+    experiments = get_user_experiments(page=page, page_size=page_size, status=status, sort=sort)
+    batch_counts = get_batch_counts([exp.id for exp in experiments])
+    
+    # Prepare everything the cards display up front
+    return tuple(
+        {
+            'id': exp.id,
+            'title': exp.title,
+            'status': exp.status or 'Planning',
+            'color': EXPERIMENT_STATUS_COLORS.get(exp.status or 'Planning', 'gray'),
+            'created_str': exp.created_at.strftime('%Y-%m-%d %H:%M'),
+            'elab_id': exp.elab_id,
+            'batch_count': batch_counts.get(exp.id, 0)
+        }
+        for exp in experiments
+    )
+
+def get_experiment(experiment_id, with_batches=False):
     """
     Get an experiment by ID
     
     Args:
         experiment_id: The ID of the experiment
+        with_batches: Also load experiment.batches as part of the same call
         
     Returns:
         The experiment object or None if not found
     """
-    session = get_session()
-    try:
-        experiment = session.query(Experiment).filter_by(id=experiment_id).first()
-        return experiment
-    finally:
-        session.close()
+    with session_scope() as session:
+        stmt = lambda_stmt(lambda: select(Experiment).where(Experiment.id == experiment_id))
+        if with_batches:
+            stmt += lambda s: s.options(selectinload(Experiment.batches))
+        return session.execute(stmt).scalar_one_or_none()
+
+def get_experiment_summary(experiment_id):
+    """
+    Get the summary columns of an experiment by ID
+    
+    Args:
+        experiment_id: The ID of the experiment
+        
+    Returns:
+        A row with id, title, status, elab_id and created_at or None if not found
+    """
+    with session_scope() as session:
+        stmt = lambda_stmt(lambda: select(*EXPERIMENT_SUMMARY_COLUMNS).where(Experiment.id == experiment_id))
+        return session.execute(stmt).first()
 
 def get_experiment_batches(experiment_id):
     """
@@ -206,12 +339,9 @@ def get_experiment_batches(experiment_id):
     Returns:
         A list of batch objects
     """
-    session = get_session()
-    try:
-        batches = session.query(Batch).filter_by(experiment_id=experiment_id).all()
-        return batches
-    finally:
-        session.close()
+    with session_scope() as session:
+        stmt = lambda_stmt(lambda: select(Batch).where(Batch.experiment_id == experiment_id))
+        return session.execute(stmt).scalars().all()
 
 def get_batch(batch_id):
     """
@@ -223,16 +353,40 @@ def get_batch(batch_id):
     Returns:
         The batch object or None if not found
     """
-    session = get_session()
-    try:
-        batch = session.query(Batch).filter_by(id=batch_id).first()
-        return batch
-    finally:
-        session.close()
+    with session_scope() as session:
+        stmt = lambda_stmt(lambda: select(Batch).where(Batch.id == batch_id))
+        return session.execute(stmt).scalar_one_or_none()
+
+def _write_batch_columns(batch_id, values):
+    """
+    Set the given columns of a batch and commit. Plain (blocking) database work,
+    so update_batch can run it in a worker thread.
+    
+    Returns:
+        True if the batch was updated, False if it doesn't exist
+    """
+    with session_scope() as session:
+        try:
+            stmt = lambda_stmt(lambda: select(Batch).where(Batch.id == batch_id))
+            batch = session.execute(stmt).scalar_one_or_none()
+            if not batch:
+                return False
+        
+            # Update batch parameters
+            for key, value in values.items():
+                if key in BATCH_COLUMNS:
+                    setattr(batch, key, value)
+        
+            session.commit()
+            return True
+        except Exception:
+            session.rollback()
+            raise
 
 async def update_batch(batch_id, **kwargs):
     """
-    Update a batch with the given parameters
+    Update a batch with the given parameters.
+    The database write runs in a worker thread, so the event loop keeps serving the UI meanwhile.
     
     Args:
         batch_id: The ID of the batch
@@ -241,25 +395,11 @@ async def update_batch(batch_id, **kwargs):
     Returns:
         True if update was successful, False otherwise
     """
-    session = get_session()
     try:
-        batch = session.query(Batch).filter_by(id=batch_id).first()
-        if not batch:
-            return False
-        
-        # Update batch parameters
-        for key, value in kwargs.items():
-            if hasattr(batch, key):
-                setattr(batch, key, value)
-        
-        session.commit()
-        return True
+        return bool(await run.io_bound(_write_batch_columns, batch_id, kwargs))
     except Exception as e:
-        session.rollback()
         ui.notify(f"Error updating batch: {str(e)}", color='negative')
         return False
-    finally:
-        session.close()
 
 async def update_experiment(experiment_id, **kwargs):
     """
@@ -272,25 +412,24 @@ async def update_experiment(experiment_id, **kwargs):
     Returns:
         True if update was successful, False otherwise
     """
-    session = get_session()
-    try:
-        experiment = session.query(Experiment).filter_by(id=experiment_id).first()
-        if not experiment:
-            return False
+    with session_scope() as session:
+        try:
+            stmt = lambda_stmt(lambda: select(Experiment).where(Experiment.id == experiment_id))
+            experiment = session.execute(stmt).scalar_one_or_none()
+            if not experiment:
+                return False
         
-        # Update experiment parameters
-        for key, value in kwargs.items():
-            if hasattr(experiment, key):
-                setattr(experiment, key, value)
+            # Update experiment parameters
+            for key, value in kwargs.items():
+                if key in EXPERIMENT_COLUMNS:
+                    setattr(experiment, key, value)
         
-        session.commit()
-        return True
-    except Exception as e:
-        session.rollback()
-        ui.notify(f"Error updating experiment: {str(e)}", color='negative')
-        return False
-    finally:
-        session.close()
+            session.commit()
+            return True
+        except Exception as e:
+            session.rollback()
+            ui.notify(f"Error updating experiment: {str(e)}", color='negative')
+            return False
 
 async def log_batch_action(batch_id, action_type, timestamp=None, **values):
     """
@@ -308,49 +447,81 @@ async def log_batch_action(batch_id, action_type, timestamp=None, **values):
     if timestamp is None:
         timestamp = datetime.datetime.utcnow()
     
-    session = get_session()
-    try:
-        batch = session.query(Batch).filter_by(id=batch_id).first()
-        if not batch:
-            return False
+    with session_scope() as session:
+        try:
+            batch = session.query(Batch).filter_by(id=batch_id).first()
+            if not batch:
+                return False
         
-        # Update the appropriate timestamp field based on action_type
-        if hasattr(batch, f"{action_type}_time"):
-            setattr(batch, f"{action_type}_time", timestamp)
-        
-        # Update any additional values
-        for key, value in values.items():
-            if hasattr(batch, key):
-                setattr(batch, key, value)
-        
-        # Update status based on action
-        status_mapping = {
-            "preparation": "Prepared",
-            "incubation_start": "Incubating",
-            "incubation_end": "Sampling",
-            "sample_split": "Analysis Pending",
-            "micro_plating": "Micro Plated",
-            "hplc_prep": "HPLC Prepped",
-            "ph_measurement": "pH Measured",
-            "scoby_wet_weight": "SCOBY Weighed",
-            "scoby_dry_weight": "Completed"
-        }
+            # Update the appropriate timestamp field based on action_type
+            if f"{action_type}_time" in BATCH_COLUMNS:
+                setattr(batch, f"{action_type}_time", timestamp)
         
-        if action_type in status_mapping:
-            batch.status = status_mapping[action_type]
+            # Update any additional values
+            for key, value in values.items():
+                if key in BATCH_COLUMNS:
+                    setattr(batch, key, value)
         
-        session.commit()
+            # Update status based on action
+            status_mapping = {
+                "preparation": "Prepared",
+                "incubation_start": "Incubating",
+                "incubation_end": "Sampling",
+                "sample_split": "Analysis Pending",
+                "micro_plating": "Micro Plated",
+                "hplc_prep": "HPLC Prepped",
+                "ph_measurement": "pH Measured",
+                "scoby_wet_weight": "SCOBY Weighed",
+                "scoby_dry_weight": "Completed"
+            }
         
-        # Update experiment status based on batch statuses
-        await update_experiment_status_from_batches(batch.experiment_id)
+            if action_type in status_mapping:
+                batch.status = status_mapping[action_type]
         
-        return True
-    except Exception as e:
-        session.rollback()
-        ui.notify(f"Error logging batch action: {str(e)}", color='negative')
+            # Update experiment status based on batch statuses in the same commit
+            apply_experiment_status_from_batches(session, batch.experiment_id)
+            session.commit()
+        
+            return True
+        except Exception as e:
+            session.rollback()
+            ui.notify(f"Error logging batch action: {str(e)}", color='negative')
+            return False
+
+# Batch statuses that mean the experiment is still running
+RUNNING_BATCH_STATUSES = frozenset({"Incubating", "Sampling"})
+
+def apply_experiment_status_from_batches(session, experiment_id):
+    """
+    Set an experiment's status from its batch statuses, without committing
+    
+    Args:
+        session: The database session to work in
+        experiment_id: The ID of the experiment
+        
+    Returns:
+        True if the experiment exists, False otherwise
+    """
+    experiment = session.get(Experiment, experiment_id)
+    if not experiment:
         return False
-    finally:
-        session.close()
+
+    statuses = set(session.execute(
+        select(Batch.status).where(Batch.experiment_id == experiment_id).distinct()
+    ).scalars())
+
+    # Determine experiment status based on batch statuses
+    if not statuses:
+        experiment.status = "Planning"
+    elif statuses == {"Completed"}:
+        experiment.status = "Completed"
+    elif "Setup" in statuses:
+        experiment.status = "Planning"
+    elif not statuses.isdisjoint(RUNNING_BATCH_STATUSES):
+        experiment.status = "Running"
+    else:
+        experiment.status = "Analysis"
+    return True
 
 async def update_experiment_status_from_batches(experiment_id):
     """
@@ -362,34 +533,17 @@ async def update_experiment_status_from_batches(experiment_id):
     Returns:
         True if update was successful, False otherwise
     """
-    session = get_session()
-    try:
-        experiment = session.query(Experiment).filter_by(id=experiment_id).first()
-        if not experiment:
-            return False
-        
-        batches = session.query(Batch).filter_by(experiment_id=experiment_id).all()
-        
-        # Determine experiment status based on batch statuses
-        if not batches:
-            experiment.status = "Planning"
-        elif all(batch.status == "Completed" for batch in batches):
-            experiment.status = "Completed"
-        elif any(batch.status == "Setup" for batch in batches):
-            experiment.status = "Planning"
-        elif any(batch.status in ["Incubating", "Sampling"] for batch in batches):
-            experiment.status = "Running"
-        else:
-            experiment.status = "Analysis"
+    with session_scope() as session:
+        try:
+            if not apply_experiment_status_from_batches(session, experiment_id):
+                return False
         
-        session.commit()
-        return True
-    except Exception as e:
-        session.rollback()
-        ui.notify(f"Error updating experiment status: {str(e)}", color='negative')
-        return False
-    finally:
-        session.close()
+            session.commit()
+            return True
+        except Exception as e:
+            session.rollback()
+            ui.notify(f"Error updating experiment status: {str(e)}", color='negative')
+            return False
 
 async def add_batch_to_experiment(experiment_id, batch_name):
     """
@@ -402,34 +556,90 @@ async def add_batch_to_experiment(experiment_id, batch_name):
     Returns:
         The ID of the created batch or None if creation fails
     """
-    session = get_session()
-    try:
-        # Create batch
-        batch = Batch(
-            experiment_id=experiment_id,
-            name=batch_name,
-            status="Setup"
-        )
+    with session_scope() as session:
+        try:
+            # Create batch
+            batch = Batch(
+                experiment_id=experiment_id,
+                name=batch_name,
+                status="Setup"
+            )
         
-        session.add(batch)
-        session.commit()
+            session.add(batch)
+            session.commit()
         
-        return batch.id
-    except Exception as e:
-        session.rollback()
-        ui.notify(f"Error adding batch: {str(e)}", color='negative')
-        return None
-    finally:
-        session.close()
+            return batch.id
+        except Exception as e:
+            session.rollback()
+            ui.notify(f"Error adding batch: {str(e)}", color='negative')
+            return None
+
+# Generated eLabFTW reports by experiment ID, stored as (updated_at, html).
+# Least recently used entries are dropped once the cache is full.
+EXPERIMENT_HTML_CACHE_SIZE = 32
+_experiment_html_cache = OrderedDict()
 
-async def sync_experiment_with_elabftw(experiment_id):
+def get_experiment_html(session, experiment):
+    """
+    Get the eLabFTW HTML report for an experiment.
+    The report is only regenerated when the experiment (or any of its batches,
+    timepoints or measurements) changed since it was last built.
+
+    Args:
+        session: The database session the experiment was loaded with
+        experiment: The experiment object
+
+    Returns:
+        The HTML content for the experiment
+    """
+    cached = _experiment_html_cache.get(experiment.id)
+    if cached and cached[0] == experiment.updated_at:
+        _experiment_html_cache.move_to_end(experiment.id)
+        return cached[1]
+
+    # Plain rows are enough for the report and skip building ORM objects
+    batches = session.execute(
+        select(Batch.__table__).where(Batch.experiment_id == experiment.id)
+    ).all()
+    timepoints = get_experiment_timepoints(experiment.id)
+
+    # Build a list of batch dicts with measurements from all timepoints
+    batch_dicts = generate_batch_dicts_bulk(batches, timepoints)
+
+    html_content = generate_experiment_html(experiment.title, batch_dicts, timepoints=timepoints)
+    _experiment_html_cache[experiment.id] = (experiment.updated_at, html_content)
+    _experiment_html_cache.move_to_end(experiment.id)
+    if len(_experiment_html_cache) > EXPERIMENT_HTML_CACHE_SIZE:
+        _experiment_html_cache.popitem(last=False)
+    return html_content
+
+def get_elab_content_hash(title, html_content):
+    """
+    Hash the title and body sent to eLabFTW, to detect syncs that would not change anything
+    
+    Args:
+        title: The experiment title
+        html_content: The HTML content of the experiment
+        
+    Returns:
+        The hex digest of the content
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(title.encode())
+    digest.update(b'\0')
+    digest.update(html_content.encode())
+    return digest.hexdigest()
+
+async def sync_experiment_with_elabftw(experiment_id, on_change=None):
     """
     Sync an experiment with eLabFTW.
     If elab_id exists, update the experiment.
     Otherwise, create a new one.
+    The eLabFTW requests run in a worker thread so they don't block the event loop.
 
     Args:
         experiment_id: The ID of the experiment
+        on_change: Optional callback to show a newly assigned eLabFTW ID (reloads the page if not given)
 
     Returns:
         True if sync was successful, False otherwise
@@ -440,97 +650,101 @@ async def sync_experiment_with_elabftw(experiment_id):
         ui.notify("API key not set. Please set your API key first.", color='negative')
         return False
 
-    session = get_session()
-    try:
-        experiment = session.query(Experiment).filter_by(id=experiment_id).first()
-        if not experiment:
-            ui.notify("Experiment not found", color='negative')
-            return False
-
-        batches = session.query(Batch).filter_by(experiment_id=experiment_id).all()
-        timepoints = get_experiment_timepoints(experiment_id)
-
-        # Build a list of batch dicts with measurements from all timepoints
-        batch_dicts = []
-        for batch in batches:
-            batch_dict = generate_batch_dict_from_db_batch(batch, timepoints=timepoints)
-            batch_dicts.append(batch_dict)
+    with session_scope() as session:
+        try:
+            experiment = session.query(Experiment).filter_by(id=experiment_id).first()
+            if not experiment:
+                ui.notify("Experiment not found", color='negative')
+                return False
 
-        # Generate full HTML report
-        html_content = generate_experiment_html(experiment.title, batch_dicts)
+            # Generate full HTML report
+            html_content = get_experiment_html(session, experiment)
+            content_hash = get_elab_content_hash(experiment.title, html_content)
+        
+            # Nothing to send if eLabFTW already has exactly this content
+            if experiment.elab_id and experiment.elab_html_hash == content_hash:
+                ui.notify(f"Experiment already up to date in eLabFTW (ID: {experiment.elab_id})", color='positive')
+                return True
 
-        # Initialize API client
-        clients = initialize_api_client(current_user.elab_api_key)
-        if not clients:
-            ui.notify("Failed to initialize API client", color='negative')
-            return False
+            # Initialize API client
+            clients = await run.io_bound(initialize_api_client, current_user.elab_api_key)
+            if not clients:
+                ui.notify("Failed to initialize API client", color='negative')
+                return False
 
-        _, exp_client, _, _ = clients
+            _, exp_client, _, _ = clients
 
-        if experiment.elab_id:
-            try:
-                # Update existing experiment
-                update_payload = {
-                    'title': experiment.title,
-                    'body': html_content,
-                }
-                exp_client.patch_experiment_with_http_info(
-                    id=experiment.elab_id,
-                    body=update_payload,
-                    async_req=False
-                )
-                ui.notify(f"Experiment updated in eLabFTW (ID: {experiment.elab_id})", color='positive')
-            except ApiException as api_error:
-                if api_error.status == 403:
-                    # Handle 403 Forbidden error (experiment deleted or access lost)
-                    # Store experiment_id before resetting elab_id
-                    experiment_id_for_dialog = experiment.id
+            if experiment.elab_id:
+                try:
+                    # Update existing experiment
+                    update_payload = {
+                        'title': experiment.title,
+                        'body': html_content,
+                    }
+                    await run.io_bound(
+                        exp_client.patch_experiment_with_http_info,
+                        id=experiment.elab_id,
+                        body=update_payload,
+                        async_req=False
+                    )
+                    # Remember what was sent without bumping updated_at, which would
+                    # needlessly invalidate the cached report
+                    session.execute(
+                        update(Experiment)
+                        .where(Experiment.id == experiment.id)
+                        .values(elab_html_hash=content_hash, updated_at=Experiment.updated_at)
+                    )
+                    session.commit()
+                    ui.notify(f"Experiment updated in eLabFTW (ID: {experiment.elab_id})", color='positive')
+                except ApiException as api_error:
+                    if api_error.status == 403:
+                        # Handle 403 Forbidden error (experiment deleted or access lost)
+                        # Store experiment_id before resetting elab_id
+                        experiment_id_for_dialog = experiment.id
                     
-                    with ui.dialog() as dialog, ui.card():
-                        ui.label("eLabFTW Access Error").classes('text-xl font-bold text-red-500')
-                        ui.label("The experiment cannot be accessed in eLabFTW. It may have been deleted or your access has been revoked.").classes('my-2')
-                        ui.label("Would you like to create a new experiment in eLabFTW?").classes('font-bold my-2')
+                        with ui.dialog() as dialog, ui.card():
+                            ui.label("eLabFTW Access Error").classes('text-xl font-bold text-red-500')
+                            ui.label("The experiment cannot be accessed in eLabFTW. It may have been deleted or your access has been revoked.").classes('my-2')
+                            ui.label("Would you like to create a new experiment in eLabFTW?").classes('font-bold my-2')
                         
-                        async def confirm_create_new():
-                            dialog.close()
-                            experiment.elab_id = None
-                            # Reset the elab_id
-                            session.commit()
-                            # Create a fresh session and get the experiment again
-                            await recreate_sync_experiment(experiment_id_for_dialog)
+                            async def confirm_create_new():
+                                dialog.close()
+                                experiment.elab_id = None
+                                # Reset the elab_id
+                                session.commit()
+                                # Create a fresh session and get the experiment again
+                                await recreate_sync_experiment(experiment_id_for_dialog, on_change)
                         
-                        async def cancel_action():
-                            dialog.close()
-                            ui.notify("Sync canceled", color='warning')
+                            async def cancel_action():
+                                dialog.close()
+                                ui.notify("Sync canceled", color='warning')
                         
-                        with ui.row().classes('w-full justify-end'):
-                            ui.button('No', on_click=cancel_action).classes('mr-2')
-                            ui.button('Yes, Create New', on_click=confirm_create_new, color='primary')
+                            with ui.row().classes('w-full justify-end'):
+                                ui.button('No', on_click=cancel_action).classes('mr-2')
+                                ui.button('Yes, Create New', on_click=confirm_create_new, color='primary')
                         
-                        dialog.open()
-                    return False
-                else:
-                    raise  # Re-raise other API exceptions
-        else:
-            # Creating new experiment - no existing elab_id
-            return await create_new_elab_experiment(experiment, html_content, session)
+                            dialog.open()
+                        return False
+                    else:
+                        raise  # Re-raise other API exceptions
+            else:
+                # Creating new experiment - no existing elab_id
+                return await create_new_elab_experiment(experiment, html_content, session, on_change)
         
-        return True
-    except ApiException as api_error:
-        session.rollback()
-        if api_error.status == 403:
-            ui.notify("Access to experiment in eLabFTW denied. The experiment may have been deleted or your access revoked.", color='negative')
-        else:
-            ui.notify(f"API Error syncing with eLabFTW: {api_error.status} {api_error.reason}", color='negative')
-        return False
-    except Exception as e:
-        session.rollback()
-        ui.notify(f"Error syncing with eLabFTW: {str(e)}", color='negative')
-        return False
-    finally:
-        session.close()
+            return True
+        except ApiException as api_error:
+            session.rollback()
+            if api_error.status == 403:
+                ui.notify("Access to experiment in eLabFTW denied. The experiment may have been deleted or your access revoked.", color='negative')
+            else:
+                ui.notify(f"API Error syncing with eLabFTW: {api_error.status} {api_error.reason}", color='negative')
+            return False
+        except Exception as e:
+            session.rollback()
+            ui.notify(f"Error syncing with eLabFTW: {str(e)}", color='negative')
+            return False
         
-async def create_new_elab_experiment(experiment, html_content, session):
+async def create_new_elab_experiment(experiment, html_content, session, on_change=None):
     """
     Create a new experiment in eLabFTW and update the local experiment record.
     
@@ -538,13 +752,15 @@ async def create_new_elab_experiment(experiment, html_content, session):
         experiment: The local experiment object
         html_content: The HTML content for the eLabFTW experiment
         session: The database session
+        on_change: Optional callback to show the new eLabFTW ID (reloads the page if not given)
         
     Returns:
         True if creation was successful, False otherwise
     """
     current_user = get_current_user()
     # Create a new experiment
-    elab_experiment = create_and_update_experiment(
+    elab_experiment = await run.io_bound(
+        create_and_update_experiment,
         api_key=current_user.elab_api_key,
         title=experiment.title,
         body=html_content,
@@ -552,57 +768,51 @@ async def create_new_elab_experiment(experiment, html_content, session):
     )
     if elab_experiment:
         experiment.elab_id = elab_experiment.id
+        experiment.elab_html_hash = get_elab_content_hash(experiment.title, html_content)
         session.commit()
-        # Reload the page to show updated sync status
-        ui.run_javascript("window.location.reload()")
+        # Show the updated sync status
+        if on_change:
+            on_change()
+        else:
+            ui.run_javascript("window.location.reload()")
         ui.notify(f"Experiment synced with eLabFTW (ID: {elab_experiment.id})", color='positive')
         return True
     else:
         ui.notify("Failed to sync with eLabFTW", color='negative')
         return False
 
-async def recreate_sync_experiment(experiment_id):
+async def recreate_sync_experiment(experiment_id, on_change=None):
     """
     Re-create an experiment in eLabFTW after access was denied to the previous one.
     Creates a fresh session and generates new content to sync.
     
     Args:
         experiment_id: The ID of the experiment to sync
+        on_change: Optional callback to show the new eLabFTW ID (reloads the page if not given)
         
     Returns:
         True if successful, False otherwise
     """
     # Create a new session and restart the sync process
     
-    new_session = get_session()
-    try:
-        # Get the experiment with the fresh session
-        experiment = new_session.query(Experiment).filter_by(id=experiment_id).first()
-        if not experiment:
-            ui.notify("Could not find experiment", color='negative')
-            return False
+    with session_scope() as new_session:
+        try:
+            # Get the experiment with the fresh session
+            experiment = new_session.query(Experiment).filter_by(id=experiment_id).first()
+            if not experiment:
+                ui.notify("Could not find experiment", color='negative')
+                return False
             
-        # Get batches and timepoints
-        batches = new_session.query(Batch).filter_by(experiment_id=experiment_id).all()
-        timepoints = get_experiment_timepoints(experiment_id)
-        
-        # Generate HTML content
-        batch_dicts = []
-        for batch in batches:
-            batch_dict = generate_batch_dict_from_db_batch(batch, timepoints=timepoints)
-            batch_dicts.append(batch_dict)
+            # Generate HTML content
+            html_content = get_experiment_html(new_session, experiment)
         
-        html_content = generate_experiment_html(experiment.title, batch_dicts)
-        
-        # Create the experiment in eLabFTW
-        result = await create_new_elab_experiment(experiment, html_content, new_session)
-        return result
-    except Exception as e:
-        new_session.rollback()
-        ui.notify(f"Error recreating experiment in eLabFTW: {str(e)}", color='negative')
-        return False
-    finally:
-        new_session.close()
+            # Create the experiment in eLabFTW
+            result = await create_new_elab_experiment(experiment, html_content, new_session, on_change)
+            return result
+        except Exception as e:
+            new_session.rollback()
+            ui.notify(f"Error recreating experiment in eLabFTW: {str(e)}", color='negative')
+            return False
 
 def create_experiment_list_ui():
     """Create the UI for listing experiments"""
@@ -623,83 +833,78 @@ def create_experiment_list_ui():
                 label='Sort by'
             )
         
-        # Get all experiments first
-        all_experiments = get_user_experiments()
-        
-        # Grid container that will be refreshed when filters change
-        experiment_grid_container = ui.element('div').classes('w-full')
+        # Map the sort options onto get_user_experiments sort keys
+        sort_keys = {
+            'Newest First': 'newest',
+            'Oldest First': 'oldest',
+            'Title A-Z': 'title_asc',
+            'Title Z-A': 'title_desc'
+        }
+        page_size = 21  # Fills the 3-column grid evenly
+        state = {'page': 0}
         
-        def apply_filters_and_sort():
-            """Apply filters and sort to the experiment list"""
-            # Clear the container
-            experiment_grid_container.clear()
-            
-            # Filter experiments
-            filtered_experiments = all_experiments
-            if status_filter.value != 'All':
-                filtered_experiments = [exp for exp in filtered_experiments if getattr(exp, 'status', 'Planning') == status_filter.value]
-            
-            # Sort experiments
-            if sort_by.value == 'Newest First':
-                filtered_experiments.sort(key=lambda x: x.created_at, reverse=True)
-            elif sort_by.value == 'Oldest First':
-                filtered_experiments.sort(key=lambda x: x.created_at)
-            elif sort_by.value == 'Title A-Z':
-                filtered_experiments.sort(key=lambda x: x.title.lower())
-            elif sort_by.value == 'Title Z-A':
-                filtered_experiments.sort(key=lambda x: x.title.lower(), reverse=True)
+        @ui.refreshable
+        def experiment_grid():
+            """Show the current page of experiments for the selected filter and sort"""
+            rows = get_experiment_list_rows(
+                page=state['page'],
+                page_size=page_size,
+                status=status_filter.value,
+                sort=sort_keys.get(sort_by.value, 'newest')
+            )
             
-            # Display filtered and sorted experiments
-            with experiment_grid_container:
-                if not filtered_experiments:
+            if not rows:
+                if state['page'] == 0:
                     ui.label('No experiments found matching filters').classes('text-gray-500')
                 else:
-                    # Create a card-based layout
-                    with ui.grid(columns=3).classes('w-full gap-4'):
-                        for exp in filtered_experiments:
-                            with ui.card().classes('w-full'):
-                                # Status indicator
-                                status = getattr(exp, 'status', 'Planning')
-                                status_colors = {
-                                    'Planning': 'blue',
-                                    'Running': 'orange',
-                                    'Analysis': 'purple',
-                                    'Completed': 'green'
-                                }
-                                status_color = status_colors.get(status, 'gray')
-                                
-                                with ui.row().classes('w-full justify-between items-center'):
-                                    ui.label(exp.title).classes('text-xl font-bold')
-                                    ui.label(status).classes(f'text-{status_color}-500 font-bold')
-                                
-                                ui.label(f'Created: {exp.created_at.strftime("%Y-%m-%d %H:%M")}')
-                                
-                                # Count batches
-                                session = get_session()
-                                try:
-                                    batch_count = session.query(Batch).filter_by(experiment_id=exp.id).count()
-                                    ui.label(f'{batch_count} Batches')
-                                finally:
-                                    session.close()
-                                
-                                # eLabFTW status
-                                if exp.elab_id:
-                                    ui.label(f'Synced with eLabFTW (ID: {exp.elab_id})').classes('text-green-500')
-                                else:
-                                    ui.label('Not synced with eLabFTW').classes('text-gray-500')
-                                  # Action buttons
-                                with ui.row().classes('w-full justify-end mt-2'):
-                                    ui.button('View/Edit', on_click=lambda e=exp.id: ui.run_javascript(f"window.location.href = '/experiment/{e}'")).classes('mr-2')
-                                    ui.button('Sync', on_click=lambda e=exp.id: sync_experiment_with_elabftw(e), color='indigo').classes('mr-2')
-                                    ui.button('Delete', on_click=lambda e=exp.id, t=exp.title: open_experiment_delete_dialog(e, t), color='red')
-          # Set up event handlers for filter and sort changes
+                    ui.label('No more experiments').classes('text-gray-500')
+            else:
+                # Create a card-based layout
+                with ui.grid(columns=3).classes('w-full gap-4'):
+                    for row in rows:
+                        with ui.card().classes('w-full'):
+                            # Status indicator
+                            with ui.row().classes('w-full justify-between items-center'):
+                                ui.label(row['title']).classes('text-xl font-bold')
+                                ui.label(row['status']).classes(f"text-{row['color']}-500 font-bold")
+                            
+                            ui.label(f"Created: {row['created_str']}")
+                            ui.label(f"{row['batch_count']} Batches")
+                            
+                            # eLabFTW status
+                            if row['elab_id']:
+                                ui.label(f"Synced with eLabFTW (ID: {row['elab_id']})").classes('text-green-500')
+                            else:
+                                ui.label('Not synced with eLabFTW').classes('text-gray-500')
+                            # Action buttons
+                            with ui.row().classes('w-full justify-end mt-2'):
+                                ui.button('View/Edit', on_click=lambda e=row['id']: ui.navigate.to(f'/experiment/{e}')).classes('mr-2')
+                                ui.button('Sync', on_click=lambda e=row['id']: sync_experiment_with_elabftw(e), color='indigo').classes('mr-2')
+                                ui.button('Delete', on_click=lambda e=row['id'], t=row['title']: open_experiment_delete_dialog(e, t), color='red')
+            
+            # Pagination controls
+            with ui.row().classes('w-full justify-center items-center mt-4'):
+                ui.button('Previous', on_click=lambda: change_page(-1)).props('flat').set_enabled(state['page'] > 0)
+                ui.label(f'Page {state["page"] + 1}')
+                ui.button('Next', on_click=lambda: change_page(1)).props('flat').set_enabled(len(rows) == page_size)
+        
+        def change_page(delta):
+            """Move to the previous or next page"""
+            state['page'] = max(0, state['page'] + delta)
+            experiment_grid.refresh()
+        
+        def apply_filters_and_sort():
+            """Go back to the first page when the filter or sort changes"""
+            state['page'] = 0
+            experiment_grid.refresh()
+        
+        # Set up event handlers for filter and sort changes
         status_filter.on_value_change(lambda: apply_filters_and_sort())
         sort_by.on_value_change(lambda: apply_filters_and_sort())
         
-        # Initial application of filters
-        apply_filters_and_sort()
+        experiment_grid()
         
-        ui.button('Create New Experiment', on_click=lambda: ui.run_javascript("window.location.href = '/new-experiment'")).classes('mt-4')
+        ui.button('Create New Experiment', on_click=lambda: ui.navigate.to('/new-experiment')).classes('mt-4')
 
 def create_new_experiment_ui():
     """Create the UI for creating a new experiment"""
@@ -717,114 +922,173 @@ def create_new_experiment_ui():
             experiment_id = await create_experiment(title.value, int(num_batches.value))
             if experiment_id:
                 ui.notify('Experiment created successfully', color='positive')
-                ui.run_javascript(f"window.location.href = '/experiment/{experiment_id}'")
+                ui.navigate.to(f'/experiment/{experiment_id}')
             else:
                 ui.notify('Failed to create experiment', color='negative')
         
         ui.button('Create', on_click=handle_create, color='green').classes('mt-4')
-        ui.button('Cancel', on_click=lambda: ui.run_javascript("window.location.href = '/'")).classes('mt-4 ml-2')
+        ui.button('Cancel', on_click=lambda: ui.navigate.to('/')).classes('mt-4 ml-2')
 
-def create_experiment_edit_ui(experiment_id):
+async def create_experiment_edit_ui(experiment_id):
     """
-    Create the UI for editing an experiment
+    Create the UI for editing an experiment.
+    The page is sent with the header, all batch card headers and the first
+    open batch card; the other open cards are filled in once the browser has connected.
     
     Args:
         experiment_id: The ID of the experiment to edit
     """
-    experiment = get_experiment(experiment_id)
+    experiment = get_experiment(experiment_id, with_batches=True)
     if not experiment:
         ui.label('Experiment not found').classes('text-xl text-red-500')
-        ui.button('Back to Dashboard', on_click=lambda: ui.run_javascript("window.location.href = '/'")).classes('mt-4')
+        ui.button('Back to Dashboard', on_click=lambda: ui.navigate.to('/')).classes('mt-4')
         return
     
-    batches = get_experiment_batches(experiment_id)    
     with ui.card().classes('w-full'):
         # Header with experiment title and status
         with ui.row().classes('w-full justify-between items-center'):
             with ui.column().classes('flex-grow'):
                 title_input = ui.input(value=experiment.title, label='Experiment Title').classes('text-2xl w-full')
             
-            status = getattr(experiment, 'status', 'Planning')
-            status_colors = {
-                'Planning': 'blue',
-                'Running': 'orange',
-                'Analysis': 'purple',
-                'Completed': 'green'
-            }
-            status_color = status_colors.get(status, 'gray')
+            status = experiment.status or 'Planning'
+            status_color = EXPERIMENT_STATUS_COLORS.get(status, 'gray')
             ui.label(f'Status: {status}').classes(f'text-{status_color}-500 font-bold')
         
         # eLabFTW sync status
-        with ui.row().classes('w-full mt-2'):
-            if experiment.elab_id:
-                ui.label(f'Synced with eLabFTW (ID: {experiment.elab_id})').classes('text-green-500')
-            else:
-                ui.label('Not synced with eLabFTW').classes('text-gray-500')
+        @ui.refreshable
+        def elab_status(elab_id):
+            """Show whether the experiment is synced with eLabFTW"""
+            with ui.row().classes('w-full mt-2'):
+                if elab_id:
+                    ui.label(f'Synced with eLabFTW (ID: {elab_id})').classes('text-green-500')
+                else:
+                    ui.label('Not synced with eLabFTW').classes('text-gray-500')
+        
+        def refresh_elab_status():
+            """Show the eLabFTW ID assigned by a sync"""
+            elab_status.refresh(get_experiment_summary(experiment_id).elab_id)
+        
+        elab_status(experiment.elab_id)
          
         # Experiment notes
         notes_input = ui.textarea(
             label='Experiment Notes',
-            value=getattr(experiment, 'notes', ''),
+            value=experiment.notes or '',
             placeholder='Enter overall experiment notes or goals here...'
         ).classes('w-full mt-4')
         
+        # Save notes once typing pauses, so a burst of keystrokes becomes a single write
+        notes_autosave = {'task': None}
+        
+        async def autosave_notes(value):
+            await asyncio.sleep(NOTES_AUTOSAVE_DELAY)
+            with notes_input:
+                await update_experiment(experiment_id, notes=value)
+        
+        def schedule_notes_autosave(e):
+            if notes_autosave['task']:
+                notes_autosave['task'].cancel()
+            notes_autosave['task'] = background_tasks.create(autosave_notes(e.value))
+        
+        notes_input.on_value_change(schedule_notes_autosave)
+        
         ui.separator()
         
         # Batches section
-        ui.label('Batches').classes('text-xl mt-4')        # Grid layout for batch cards - changed to 1 column
-        with ui.grid(columns=1).classes('w-full gap-4 mt-2'):
-            for batch in batches:
-                # Check if batch has any parameters set
-                has_parameters = (batch.tea_type or 
-                                batch.tea_concentration is not None or 
-                                batch.water_amount is not None or 
-                                batch.sugar_type or 
-                                batch.sugar_concentration is not None or 
-                                batch.inoculum_concentration is not None or 
-                                batch.temperature is not None)
+        ui.label('Batches').classes('text-xl mt-4')
+        
+        def build_batch_details(batch):
+            """Build the parameter listing and action buttons of a batch card"""
+            # Batch header with name and status (name is now in expansion header)
+            # Full parameter listing
+            with ui.column().classes('text-sm text-gray-700 mt-2'):
+                if batch.tea_type:
+                    ui.html(f'<b>Tea Type:</b> {batch.tea_type}')
+                if batch.tea_concentration is not None:
+                    ui.html(f'<b>Tea Concentration:</b> {batch.tea_concentration} g/L')
+                if batch.water_amount is not None:
+                    ui.html(f'<b>Water Amount:</b> {batch.water_amount} mL')
+                if batch.sugar_type:
+                    ui.html(f'<b>Sugar Type:</b> {batch.sugar_type}')
+                if batch.sugar_concentration is not None:
+                    ui.html(f'<b>Sugar Concentration:</b> {batch.sugar_concentration} g/L')
+                if batch.inoculum_concentration is not None:
+                    ui.html(f'<b>Inoculum Concentration:</b> {batch.inoculum_concentration} %')
+                if batch.temperature is not None:
+                    ui.html(f'<b>Temperature:</b> {batch.temperature} °C')
+                #if batch.status:
+                #    ui.html(f'<b>Status:</b> {batch.status}')
+        
+            # Action buttons moved here
+            with ui.row().classes('w-full justify-end mt-2'):
+                ui.button(
+                    'View Details',
+                    on_click=lambda b=batch.id: ui.navigate.to(f'/batch/{b}')
+                ).classes('mr-2')
+                ui.button(
+                    'Quick Edit',
+                    on_click=lambda b=batch.id: open_batch_edit_dialog(b, batch_list.refresh)
+                ).classes('mr-2')
+                ui.button(
+                    'Duplicate',
+                    on_click=lambda b=batch.id: duplicate_batch(b, batch_list.refresh)
+                ).classes('mr-2')
+                ui.button(
+                    'Delete',
+                    on_click=lambda b_id=batch.id, b_name=batch.name: open_delete_dialog(b_id, b_name, batch_list.refresh),
+                    color='red'
+                )
+        
+        def build_on_first_open(expansion, batch):
+            """Build a collapsed batch card's contents only once it is opened"""
+            built = False
+            
+            def on_open(e):
+                nonlocal built
+                if e.value and not built:
+                    built = True
+                    with expansion:
+                        build_batch_details(batch)
+            
+            expansion.on_value_change(on_open)
+        
+        # The first render uses the batches loaded with the experiment
+        preloaded = {'batches': experiment.batches}
+        # Open batch cards whose contents wait for the browser to connect (first render only)
+        deferred_details = []
+        
+        @ui.refreshable
+        def batch_list():
+            """Show the experiment's batches; refreshed after batch changes instead of reloading the page"""
+            batches = preloaded.pop('batches', None)
+            first_render = batches is not None
+            if not first_render:
+                batches = get_experiment_batches(experiment_id)
+            built_open_card = False
+            # Grid layout for batch cards - changed to 1 column
+            with ui.grid(columns=1).classes('w-full gap-4 mt-2'):
+                for batch in batches:
+                    # Check if batch has any parameters set
+                    has_parameters = (batch.tea_type or 
+                                    batch.tea_concentration is not None or 
+                                    batch.water_amount is not None or 
+                                    batch.sugar_type or 
+                                    batch.sugar_concentration is not None or 
+                                    batch.inoculum_concentration is not None or 
+                                    batch.temperature is not None)
                 
-                with ui.card().classes('w-full'):
-                    # Open by default if no parameters are set
-                    with ui.expansion(batch.name, icon='science', value=not has_parameters).classes('w-full'):
-                        # Batch header with name and status (name is now in expansion header)
-                        # Full parameter listing
-                        with ui.column().classes('text-sm text-gray-700 mt-2'):
-                            if batch.tea_type:
-                                ui.html(f'<b>Tea Type:</b> {batch.tea_type}')
-                            if batch.tea_concentration is not None:
-                                ui.html(f'<b>Tea Concentration:</b> {batch.tea_concentration} g/L')
-                            if batch.water_amount is not None:
-                                ui.html(f'<b>Water Amount:</b> {batch.water_amount} mL')
-                            if batch.sugar_type:
-                                ui.html(f'<b>Sugar Type:</b> {batch.sugar_type}')
-                            if batch.sugar_concentration is not None:
-                                ui.html(f'<b>Sugar Concentration:</b> {batch.sugar_concentration} g/L')
-                            if batch.inoculum_concentration is not None:
-                                ui.html(f'<b>Inoculum Concentration:</b> {batch.inoculum_concentration} %')
-                            if batch.temperature is not None:
-                                ui.html(f'<b>Temperature:</b> {batch.temperature} °C')
-                            #if batch.status:
-                            #    ui.html(f'<b>Status:</b> {batch.status}')
-                        
-                        # Action buttons moved here
-                        with ui.row().classes('w-full justify-end mt-2'):
-                            ui.button(
-                                'View Details',
-                                on_click=lambda b=batch.id: ui.run_javascript(f"window.location.href = '/batch/{b}'")
-                            ).classes('mr-2')
-                            ui.button(
-                                'Quick Edit',
-                                on_click=lambda b=batch.id: open_batch_edit_dialog(b)
-                            ).classes('mr-2')
-                            ui.button(
-                                'Duplicate',
-                                on_click=lambda b=batch.id: duplicate_batch(b)
-                            ).classes('mr-2')
-                            ui.button(
-                                'Delete',
-                                on_click=lambda b_id=batch.id, b_name=batch.name: open_delete_dialog(b_id, b_name),
-                                color='red'
-                            )
+                    with ui.card().classes('w-full'):
+                        # Open by default if no parameters are set
+                        with ui.expansion(batch.name, icon='science', value=not has_parameters).classes('w-full') as expansion:
+                            if not expansion.value:
+                                build_on_first_open(expansion, batch)
+                            elif first_render and built_open_card:
+                                deferred_details.append((expansion, batch))
+                            else:
+                                build_batch_details(batch)
+                                built_open_card = True
+        
+        batch_list()
         ui.separator()
         
         # Experiment actions
@@ -841,31 +1105,42 @@ def create_experiment_edit_ui(experiment_id):
                     ui.notify('Failed to save experiment', color='negative')
 
             ui.button('Save Experiment', on_click=save_experiment, color='green').classes('mr-2')
-            ui.button('Sync with eLabFTW', on_click=lambda: sync_experiment_with_elabftw(experiment_id), color='indigo').classes('mr-2')            # Workflow buttons
+            ui.button('Sync with eLabFTW', on_click=lambda: sync_experiment_with_elabftw(experiment_id, refresh_elab_status), color='indigo').classes('mr-2')            # Workflow buttons
             ui.button(
                 'Workflow Tracking',
-                on_click=lambda: ui.run_javascript(f"window.location.href = '/experiment/{experiment_id}/workflow'"),
+                on_click=lambda: ui.navigate.to(f'/experiment/{experiment_id}/workflow'),
                 color='purple'
             ).classes('mr-2')
 
             ui.button(
                 'Measurements Overview',
-                on_click=lambda: ui.run_javascript(f"window.location.href = '/experiment/{experiment_id}/overview'"),
+                on_click=lambda: ui.navigate.to(f'/experiment/{experiment_id}/overview'),
                 color='amber'
             ).classes('mr-2')
 
             ui.button(
                 'Configure Timepoints',
-                on_click=lambda: ui.run_javascript(f"window.location.href = '/experiment/{experiment_id}/timepoints'"),
+                on_click=lambda: ui.navigate.to(f'/experiment/{experiment_id}/timepoints'),
                 color='pink'
             ).classes('mr-2')
+    
+    # Fill in the remaining open batch cards once the page is on screen
+    if deferred_details:
+        try:
+            await ui.context.client.connected()
+        except TimeoutError:
+            return
+        for expansion, batch in deferred_details:
+            with expansion:
+                build_batch_details(batch)
 
-def open_batch_edit_dialog(batch_id):
+def open_batch_edit_dialog(batch_id, on_change=None):
     """
     Open a dialog to edit batch parameters
     
     Args:
         batch_id: The ID of the batch to edit
+        on_change: Optional callback to update the page after saving (reloads the page if not given)
     """
     batch = get_batch(batch_id)
     if not batch:
@@ -875,33 +1150,34 @@ def open_batch_edit_dialog(batch_id):
     with ui.dialog() as dialog, ui.card():
         ui.label(f'Edit Batch: {batch.name}').classes('text-xl font-bold')
         
-        name_input = ui.input('Name', value=batch.name).classes('w-full')
-        tea_type_input = ui.input('Tea Type', value=batch.tea_type, placeholder='e.g. Green, Black, Herbal').classes('w-full')
-        tea_conc_input = ui.number('Tea Concentration (g/L)', value=batch.tea_concentration).classes('w-full')
-        water_input = ui.number('Water Amount (mL)', value=batch.water_amount).classes('w-full')
-        sugar_type_input = ui.input('Sugar Type', value=batch.sugar_type, placeholder='e.g. White, Brown, Honey').classes('w-full')
-        sugar_conc_input = ui.number('Sugar Concentration (g/L)', value=batch.sugar_concentration).classes('w-full')
-        inoc_conc_input = ui.number('Inoculum Concentration (%)', value=batch.inoculum_concentration, min=0, max=100).classes('w-full')
-        temp_input = ui.number('Temperature (°C)', value=batch.temperature).classes('w-full')
+        # Inputs keyed by the Batch column they edit
+        inputs = {
+            'name': ui.input('Name', value=batch.name).classes('w-full'),
+            'tea_type': ui.input('Tea Type', value=batch.tea_type, placeholder='e.g. Green, Black, Herbal').classes('w-full'),
+            'tea_concentration': ui.number('Tea Concentration (g/L)', value=batch.tea_concentration).classes('w-full'),
+            'water_amount': ui.number('Water Amount (mL)', value=batch.water_amount).classes('w-full'),
+            'sugar_type': ui.input('Sugar Type', value=batch.sugar_type, placeholder='e.g. White, Brown, Honey').classes('w-full'),
+            'sugar_concentration': ui.number('Sugar Concentration (g/L)', value=batch.sugar_concentration).classes('w-full'),
+            'inoculum_concentration': ui.number('Inoculum Concentration (%)', value=batch.inoculum_concentration, min=0, max=100).classes('w-full'),
+            'temperature': ui.number('Temperature (°C)', value=batch.temperature).classes('w-full'),
+        }
         
         async def save_batch():
-            success = await update_batch(
-                batch_id,
-                name=name_input.value,
-                tea_type=tea_type_input.value,
-                tea_concentration=tea_conc_input.value,
-                water_amount=water_input.value,
-                sugar_type=sugar_type_input.value,
-                sugar_concentration=sugar_conc_input.value,
-                inoculum_concentration=inoc_conc_input.value,
-                temperature=temp_input.value
-            )
+            values = {field: element.value for field, element in inputs.items()}
+            # The write runs in a worker thread, so the close reaches the browser
+            # while it is in progress; the dialog is reopened with the entered
+            # values if saving fails
+            dialog.close()
+            success = await update_batch(batch_id, **values)
             if success:
                 ui.notify('Batch updated successfully', color='positive')
-                dialog.close()
-                ui.run_javascript("window.location.reload()")
+                if on_change:
+                    on_change()
+                else:
+                    ui.run_javascript("window.location.reload()")
             else:
                 ui.notify('Failed to update batch', color='negative')
+                dialog.open()
         
         with ui.row().classes('w-full justify-end'):
             ui.button('Cancel', on_click=dialog.close).classes('mr-2')
@@ -919,10 +1195,10 @@ def create_batch_detail_ui(batch_id):
     batch = get_batch(batch_id)
     if not batch:
         ui.label('Batch not found').classes('text-xl text-red-500')
-        ui.button('Back to Dashboard', on_click=lambda: ui.run_javascript("window.location.href = '/'")).classes('mt-4')
+        ui.button('Back to Dashboard', on_click=lambda: ui.navigate.to('/')).classes('mt-4')
         return
     
-    experiment = get_experiment(batch.experiment_id)
+    experiment = get_experiment_summary(batch.experiment_id)
     
     # Header section
     with ui.card().classes('w-full'):
@@ -932,7 +1208,7 @@ def create_batch_detail_ui(batch_id):
                 ui.label(f'Experiment: {experiment.title}').classes('text-lg')
                 ui.button(
                     'Back to Experiment',
-                    on_click=lambda: ui.run_javascript(f"window.location.href = '/experiment/{batch.experiment_id}'")
+                    on_click=lambda: ui.navigate.to(f'/experiment/{batch.experiment_id}')
                 ).classes('mt-4')
     
     # Key parameters display
@@ -1,69 +1,169 @@
 from nicegui import ui, app
-from src.database import setup_database, get_engine
+from src.database import setup_database, create_indexes, get_engine, request_scope
 from src.auth import create_login_ui, create_register_ui, create_api_key_ui, login_required, get_current_user, logout
-from src.experiments import create_experiment_list_ui, create_new_experiment_ui, create_experiment_edit_ui, create_batch_detail_ui
-from src.timepoints import create_timepoint_workflow_ui, create_timepoint_config_ui
-from src.timepoints_overview import create_measurements_overview_ui
 import sqlalchemy as sa
+from pathlib import Path
 from sqlalchemy import inspect
+from starlette.responses import RedirectResponse
 
-# Set up the database
-engine = setup_database()
+def get_table_columns(engine, table_names):
+    """
+    Reflect the column names of several tables in one inspector call
+    
+    Args:
+        engine: The database engine
+        table_names: The tables to reflect
+        
+    Returns:
+        A dict of table name to set of column names (tables that don't exist are left out)
+    """
+    reflected = inspect(engine).get_multi_columns(filter_names=list(table_names))
+    return {name: {col['name'] for col in columns} for (_, name), columns in reflected.items()}
+
+def add_column(engine, statement):
+    """
+    Run one ALTER TABLE ... ADD COLUMN statement in its own transaction, so each
+    column addition is applied or not on its own. A column that already exists
+    (e.g. added by an earlier, interrupted run) is not an error.
+    
+    Args:
+        engine: The database engine
+        statement: The ALTER TABLE statement
+    """
+    try:
+        with engine.begin() as conn:
+            conn.execute(sa.text(statement))
+    except sa.exc.OperationalError as e:
+        if 'duplicate column' not in str(e).lower():
+            raise
+        print("Column already exists, skipping.")
 
 # Migrate batch status column if needed
-def migrate_batch_status():
+def migrate_batch_status(engine, table_columns):
     """Add status column to batches table if it doesn't exist"""
     try:
         print("Checking if batch status migration is needed...")
-        inspector = inspect(engine)
 
         # Check if batches table exists
-        if 'batches' in inspector.get_table_names():
+        if 'batches' in table_columns:
             # Check if status column already exists in batches table
-            columns = [col['name'] for col in inspector.get_columns('batches')]
-
-            if 'status' not in columns:
+            if 'status' not in table_columns['batches']:
                 print("Adding status column to batches table...")
 
                 # Create the new column
-                with engine.begin() as conn:
-                    conn.execute(sa.text(
-                        "ALTER TABLE batches ADD COLUMN status VARCHAR DEFAULT 'Setup' NOT NULL"
-                    ))
+                add_column(engine, "ALTER TABLE batches ADD COLUMN status VARCHAR DEFAULT 'Setup' NOT NULL")
                 print("Batch status migration completed successfully!")
             else:
                 print("Status column already exists. No migration needed.")
+        return True
     except Exception as e:
         print(f"Error during batch status migration: {str(e)}")
+        return False
+
+# Columns added to the experiments table after its first release
+EXPERIMENT_COLUMN_MIGRATIONS = {
+    'updated_at': "ALTER TABLE experiments ADD COLUMN updated_at DATETIME",
+    'elab_html_hash': "ALTER TABLE experiments ADD COLUMN elab_html_hash VARCHAR(64)",
+}
+
+# Add missing columns to experiments if needed
+def migrate_experiment_columns(engine, table_columns):
+    """Add columns missing from the experiments table"""
+    try:
+        print("Checking if experiment column migration is needed...")
+
+        if 'experiments' in table_columns:
+            missing = [name for name in EXPERIMENT_COLUMN_MIGRATIONS if name not in table_columns['experiments']]
 
-# Run migration
-migrate_batch_status()
+            if missing:
+                for name in missing:
+                    print(f"Adding {name} column to experiments table...")
+                    add_column(engine, EXPERIMENT_COLUMN_MIGRATIONS[name])
+                print("Experiment column migration completed successfully!")
+            else:
+                print("Experiment columns up to date. No migration needed.")
+        return True
+    except Exception as e:
+        print(f"Error during experiment column migration: {str(e)}")
+        return False
+
+# Version of the schema the migrations above bring a database to, stored in
+# SQLite's user_version. Bump it whenever a migration is added.
+SCHEMA_VERSION = 1
+
+def run_migrations():
+    """Run the migrations, unless the database is already at SCHEMA_VERSION"""
+    engine = get_engine()
+    with engine.connect() as conn:
+        version = conn.exec_driver_sql("PRAGMA user_version").scalar()
+    if version >= SCHEMA_VERSION:
+        return
+
+    table_columns = get_table_columns(engine, ('batches', 'experiments'))
+    if migrate_batch_status(engine, table_columns) and migrate_experiment_columns(engine, table_columns):
+        with engine.begin() as conn:
+            conn.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+def bootstrap():
+    """
+    Create the database tables and bring the schema up to date.
+    Called by the entry point before serving, so importing this module
+    (e.g. from tests or tooling) doesn't touch the database.
+    """
+    setup_database()
+    run_migrations()
+    create_indexes()
 
 # Set up the app
 app.title = 'Kombucha ELN'
 
-# Define routes
-@ui.page('/')
-@login_required
-def index():
-    with ui.column().classes('w-full max-w-6xl mx-auto p-4'):
+def page_shell(actions):
+    """
+    Build the layout shared by the app pages: a header row with the app title
+    and action buttons, followed by a separator
+    
+    Args:
+        actions: A list of (label, on_click, color) tuples for the header buttons
+        
+    Returns:
+        The page's main column, to be entered with `with` to add the page content
+    """
+    column = ui.column().classes('w-full max-w-6xl mx-auto p-4')
+    with column:
         with ui.row().classes('w-full justify-between items-center'):
             ui.label('Kombucha ELN').classes('text-3xl')
 
             with ui.row():
-                ui.button('API Key', on_click=lambda: ui.run_javascript("window.location.href = '/api-key'"), color='blue').classes('mr-2')
+                for label, on_click, color in actions:
+                    ui.button(label, on_click=on_click, color=color).classes('mr-2')
 
-                def handle_logout():
-                    # Clear user from session
-                    if 'username' in app.storage.user:
-                        del app.storage.user['username']
-                    # Navigate to login page
-                    logout()
+        ui.separator()
+    return column
 
-                ui.button('Logout', on_click=handle_logout, color='red')
+# Header action returning to the experiment list
+BACK_TO_DASHBOARD = ('Back to Dashboard', lambda: ui.navigate.to('/'), 'gray')
 
-        ui.separator()
+def back_to_experiment(experiment_id):
+    """Header action returning to an experiment's page"""
+    return ('Back to Experiment', lambda: ui.navigate.to(f'/experiment/{experiment_id}'), 'gray')
 
+# Define routes. The page modules are imported inside the handlers, so
+# starting the app (or a reload) doesn't pay for routes nobody opened yet.
+@ui.page('/')
+@login_required
+def index():
+    def handle_logout():
+        # Clear user from session
+        if 'username' in app.storage.user:
+            del app.storage.user['username']
+        # Navigate to login page
+        logout()
+
+    with page_shell([
+        ('API Key', lambda: ui.navigate.to('/api-key'), 'blue'),
+        ('Logout', handle_logout, 'red'),
+    ]):
+        from src.experiments import create_experiment_list_ui
         create_experiment_list_ui()
 
 @ui.page('/login')
@@ -81,154 +181,76 @@ def register_page():
 @ui.page('/api-key')
 @login_required
 def api_key_page():
-    with ui.column().classes('w-full max-w-6xl mx-auto p-4'):
-        with ui.row().classes('w-full justify-between items-center'):
-            ui.label('Kombucha ELN').classes('text-3xl')
-            ui.button('Back to Dashboard', on_click=lambda: ui.run_javascript("window.location.href = '/'"), color='gray').classes('mr-2')
-
-        ui.separator()
-
+    with page_shell([BACK_TO_DASHBOARD]):
         create_api_key_ui()
 
 @ui.page('/new-experiment')
 @login_required
 def new_experiment_page():
-    with ui.column().classes('w-full max-w-6xl mx-auto p-4'):
-        with ui.row().classes('w-full justify-between items-center'):
-            ui.label('Kombucha ELN').classes('text-3xl')
-            ui.button('Back to Dashboard', on_click=lambda: ui.run_javascript("window.location.href = '/'"), color='gray').classes('mr-2')
-
-        ui.separator()
-
+    with page_shell([BACK_TO_DASHBOARD]):
+        from src.experiments import create_new_experiment_ui
         create_new_experiment_ui()
 
 @ui.page('/experiment/{experiment_id}')
 @login_required
-def experiment_page(experiment_id: int):
-    with ui.column().classes('w-full max-w-6xl mx-auto p-4'):
-        with ui.row().classes('w-full justify-between items-center'):
-            ui.label('Kombucha ELN').classes('text-3xl')
-            ui.button('Back to Dashboard', on_click=lambda: ui.run_javascript("window.location.href = '/'"), color='gray').classes('mr-2')
-
-        ui.separator()
-
-        create_experiment_edit_ui(experiment_id)
+async def experiment_page(experiment_id: int):
+    with page_shell([BACK_TO_DASHBOARD]):
+        from src.experiments import create_experiment_edit_ui
+        await create_experiment_edit_ui(experiment_id)
 
 @ui.page('/batch/{batch_id}')
 @login_required
 def batch_page(batch_id: int):
-    with ui.column().classes('w-full max-w-6xl mx-auto p-4'):
-        with ui.row().classes('w-full justify-between items-center'):
-            ui.label('Kombucha ELN').classes('text-3xl')
-            ui.button('Back to Dashboard', on_click=lambda: ui.run_javascript("window.location.href = '/'"), color='gray').classes('mr-2')
-
-        ui.separator()
-
+    with page_shell([BACK_TO_DASHBOARD]):
+        from src.experiments import create_batch_detail_ui
         create_batch_detail_ui(batch_id)
 
 @ui.page('/experiment/{experiment_id}/workflow')
 @login_required
 def experiment_workflow_page(experiment_id: int):
-    with ui.column().classes('w-full max-w-6xl mx-auto p-4'):
-        with ui.row().classes('w-full justify-between items-center'):
-            ui.label('Kombucha ELN').classes('text-3xl')
-            ui.button('Back to Experiment', on_click=lambda: ui.run_javascript(f"window.location.href = '/experiment/{experiment_id}'"), color='gray').classes('mr-2')
-
-        ui.separator()
-
+    with page_shell([back_to_experiment(experiment_id)]):
+        from src.timepoints import create_timepoint_workflow_ui
         create_timepoint_workflow_ui(experiment_id)
 
 @ui.page('/experiment/{experiment_id}/timepoints')
 @login_required
 def experiment_timepoints_page(experiment_id: int):
-    with ui.column().classes('w-full max-w-6xl mx-auto p-4'):
-        with ui.row().classes('w-full justify-between items-center'):
-            ui.label('Kombucha ELN').classes('text-3xl')
-            ui.button('Back to Experiment', on_click=lambda: ui.run_javascript(f"window.location.href = '/experiment/{experiment_id}'"), color='gray').classes('mr-2')
-
-        ui.separator()
-
+    with page_shell([back_to_experiment(experiment_id)]):
+        from src.timepoints import create_timepoint_config_ui
         create_timepoint_config_ui(experiment_id)
 
 @ui.page('/experiment/{experiment_id}/overview')
 @login_required
 def experiment_overview_page(experiment_id: int):
-    with ui.column().classes('w-full max-w-6xl mx-auto p-4'):
-        with ui.row().classes('w-full justify-between items-center'):
-            ui.label('Kombucha ELN').classes('text-3xl')
-            ui.button('Back to Experiment', on_click=lambda: ui.run_javascript(f"window.location.href = '/experiment/{experiment_id}'"), color='gray').classes('mr-2')
-
-        ui.separator()
-
+    with page_shell([back_to_experiment(experiment_id)]):
+        from src.timepoints_overview import create_measurements_overview_ui
         create_measurements_overview_ui(experiment_id)
 
-# Add custom CSS
-@ui.page('/styles.css')
-def styles():    return """
-    body {
-        font-family: 'Arial', sans-serif;
-        background-color: #f5f5f5;
-    }
-
-    .nicegui-card {
-        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-        border-radius: 8px;
-    }
-
-    .nicegui-button {
-        border-radius: 4px;
-    }    /* Mobile-specific styles */
-    @media (max-width: 640px) {
-        .nicegui-button {
-            width: 100%; /* Full width buttons on small screens */
-        }
-        
-        .ui-table {
-            overflow-x: auto; /* Allow tables to scroll horizontally on small screens */
-        }
-        
-        /* Ensure adequate touch target size */
-        button, 
-        [role="button"], 
-        input[type="button"], 
-        input[type="submit"], 
-        input[type="reset"] {
-            min-height: 44px;
-            min-width: 44px;
-        }
-        
-        /* Make inputs more touch-friendly */
-        input,
-        select,
-        textarea {
-            font-size: 16px !important; /* Prevent iOS zoom on focus */
-            padding: 10px !important;
-        }
-        
-        /* Better spacing for form elements on mobile */
-        .q-field {
-            margin-bottom: 16px !important;
-        }
-
-        /* Ensure dialogs don't exceed screen width */
-        .q-dialog__inner {
-            max-width: 90vw !important;
-        }
-    }
-    """
+# Custom CSS, read once at startup and inlined into every page's head so it
+# needs no extra request
+APP_CSS = (Path(__file__).parent.parent / 'static' / 'styles.css').read_text()
 
-# Add custom head content
-ui.add_head_html("""
-<link rel="stylesheet" href="/styles.css">
+# Add custom head content to all pages
+ui.add_head_html(f"""
+<style>{APP_CSS}</style>
 <meta name="viewport" content="width=device-width, initial-scale=1.0">
-""")
+""", shared=True)
+
+# Paths that can be requested without logging in
+PUBLIC_PATHS = frozenset({'/login', '/register', '/favicon.ico'})
+PUBLIC_PREFIXES = ('/_nicegui',)
 
 # Redirect to login if not authenticated
 @app.middleware('http')
 async def auth_middleware(request, call_next):
-    if request.url.path not in ['/login', '/register', '/styles.css'] and not request.url.path.startswith('/_nicegui'):
+    # Public pages and NiceGUI's own assets/websocket traffic need neither a login nor a session
+    path = request.url.path
+    if path in PUBLIC_PATHS or path.startswith(PUBLIC_PREFIXES):
+        return await call_next(request)
+
+    # Database calls made while handling the request share one session
+    with request_scope():
         if get_current_user() is None:
             # Use a different approach for redirection
-            from starlette.responses import RedirectResponse
             return RedirectResponse(url='/login')
-    return await call_next(request)
+        return await call_next(request)
@@ -1,125 +1,66 @@
-from src.timepoints import get_batch_measurement
-
-def generate_batch_dict_from_db_batch(batch, timepoints=None):
-    batch_dict = {
-        'name': batch.name,
-        'tea_type': batch.tea_type,
-        'tea_concentration': batch.tea_concentration,
-        'water_amount': batch.water_amount,
-        'sugar_type': batch.sugar_type,
-        'sugar_concentration': batch.sugar_concentration,
-        'inoculum_concentration': batch.inoculum_concentration,
-        'temperature': batch.temperature,
-        'status': batch.status,
-        'measurements': []
-    }
+from collections import defaultdict
+from operator import attrgetter
+from src.timepoints import get_batch_measurement, get_measurements_for_batches
 
-    if timepoints:
-        for tp in timepoints:
-            m = get_batch_measurement(batch.id, tp.id)
-            if m:
-                measurement_data = {
-                    'timepoint': tp.name,
-                    'ph_value': m.ph_value,
-                    'ph_sample_time': m.ph_sample_time,
-                    'micro_results': m.micro_results,
-                    'micro_sample_time': m.micro_sample_time,
-                    'hplc_results': m.hplc_results,
-                    'hplc_sample_time': m.hplc_sample_time,
-                    'scoby_wet_weight': m.scoby_wet_weight,
-                    'scoby_dry_weight': m.scoby_dry_weight,
-                    'notes': m.notes,
-                    'completed': m.completed
-                }
-                batch_dict['measurements'].append(measurement_data)
+# Escapes for user-entered text placed in the report HTML
+_HTML_ESCAPES = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'})
 
-    return batch_dict
+def _esc(value):
+    """HTML-escape a string value; other values (numbers, None) are returned unchanged"""
+    return value.translate(_HTML_ESCAPES) if isinstance(value, str) else value
 
-def generate_experiment_html(experiment_title, samples):
-    """
-    Generate HTML content for an experiment with samples
+# Characters of the micro and HPLC results shown in the report tables
+RESULTS_PREVIEW_LENGTH = 30
 
-    Args:
-        experiment_title: The title of the experiment
-        samples: A list of sample dictionaries with parameters
-
-    Returns:
-        HTML string for the experiment
-    """
-
-    # Count how many samples have results
-    samples_with_results = 0
-    for sample in samples:
-        if sample.get('ph_value') or sample.get('micro_results') or sample.get('hplc_results'):
-            samples_with_results += 1
+def _format_time(value):
+    """Format a sample time as 'YYYY-MM-DD HH:MM' ('N/A' if not set)"""
+    # isoformat gives the same text as strftime('%Y-%m-%d %H:%M') for the naive
+    # datetimes stored in the database, at a fraction of the cost
+    return value.isoformat(' ', 'minutes') if value else 'N/A'
 
-    html = f"""
+REPORT_STYLE = """
     <style>
-        body {{
+        body {
             font-family: Arial, sans-serif;
             line-height: 1.6;
             color: #333;
             margin: 0;
             padding: 20px;
-        }}
-        .report-section {{
+        }
+        .report-section {
             margin-bottom: 30px;
-        }}
-        .section-title {{
+        }
+        .section-title {
             font-size: 18px;
             font-weight: bold;
             margin-bottom: 15px;
             padding-bottom: 5px;
             border-bottom: 1px solid #eee;
-        }}
-        table {{
+        }
+        table {
             width: 100%;
             border-collapse: collapse;
             margin-bottom: 20px;
-        }}
-        th, td {{
+        }
+        th, td {
             padding: 10px;
             border: 1px solid #ddd;
             text-align: left;
             font-size: 13px;
-        }}
-        th {{
+        }
+        th {
             background-color: #f5f5f5;
             font-weight: bold;
             font-size: 14px;
-        }}
-        tr:nth-child(even) {{
+        }
+        tr:nth-child(even) {
             background-color: #f9f9f9;
-        }}
+        }
     </style>
+"""
 
-    <div class="report-section">
-        <p>
-        <div class="section-title">Abstract</div>
-        <p>
-        <p>
-            This report documents a kombucha fermentation experiment involving {len(samples)} different batches/samples.
-            The experiment investigates the effects of various parameters on kombucha fermentation, including tea type,
-            sugar concentration, and fermentation temperature.
-        </p>
-    </div>
-
-    <div class="report-section">
-        <p>
-        <div class="section-title">Materials and Methods</div>
-        <p>
-        <p>
-            The experiment was conducted using {len(samples)} different batches with varying parameters.
-            Each batch was prepared according to the parameters specified in the table below and monitored
-            throughout the fermentation process. Measurements were taken at specific timepoints to track
-            changes in pH, microbial composition, and metabolite production.
-        </p>
-
-        <p>
-        <div class="section-title">Experimental Setup</div>
-        <p>
-
-        <table>
+# Static sections of the report, in the order they appear
+SETUP_TABLE_HEAD = """        <table>
             <thead>
                 <tr>
                     <th>Batch/Sample</th>
@@ -136,22 +77,7 @@ def generate_experiment_html(experiment_title, samples):
             <tbody>
     """
 
-    for sample in samples:
-        html += f"""
-            <tr>
-                <td>{sample.get('name', '')}</td>
-                <td>{sample.get('tea_type', '')}</td>
-                <td>{sample.get('tea_concentration', '')} g/L</td>
-                <td>{sample.get('water_amount', '')} mL</td>
-                <td>{sample.get('sugar_type', '')}</td>
-                <td>{sample.get('sugar_concentration', '')} g/L</td>
-                <td>{sample.get('inoculum_concentration', '')} %</td>
-                <td>{sample.get('temperature', '')} °C</td>
-                <td>{sample.get('status', 'Setup')}</td>
-            </tr>
-        """
-
-    html += """
+SETUP_TABLE_END = """
             </tbody>
         </table>
     </div>
@@ -162,27 +88,8 @@ def generate_experiment_html(experiment_title, samples):
         <p>
     """
 
-    # Check if we have any measurement data in any sample at any timepoint
-    has_measurements = any(
-        m.get('ph_value') or m.get('micro_results') or m.get('hplc_results') or m.get('scoby_wet_weight')
-        for sample in samples
-        for m in sample.get('measurements', [])
-    )
-
-    if has_measurements:
-        from collections import defaultdict
-        timepoint_groups = defaultdict(list)
-
-        for sample in samples:
-            for m in sample.get('measurements', []):
-                tp = m.get('timepoint')
-                if tp:
-                    timepoint_groups[tp].append((sample.get('name'), m))
-
-        for tp_name, entries in sorted(timepoint_groups.items(), key=lambda x: int(x[0][1:])):
-            html += f"""
-            <h4 style="margin-top: 1em;">Timepoint: {tp_name}</h4>
-            <table>
+# Header of the per-timepoint measurement tables
+MEASUREMENT_TABLE_HEAD = """            <table>
                 <thead>
                     <tr>
                         <th>Batch</th>
@@ -199,28 +106,12 @@ def generate_experiment_html(experiment_title, samples):
                 </thead>
                 <tbody>
             """
-            for batch_name, m in entries:
-                html += f"""
-                    <tr>
-                        <td>{batch_name}</td>
-                        <td>{m.get('ph_value') or 'N/A'}</td>
-                        <td>{m.get('ph_sample_time').strftime('%Y-%m-%d %H:%M') if m.get('ph_sample_time') else 'N/A'}</td>
-                        <td>{(m.get('micro_results')[:30]) if m.get('micro_results') else 'N/A'}</td>
-                        <td>{m.get('micro_sample_time').strftime('%Y-%m-%d %H:%M') if m.get('micro_sample_time') else 'N/A'}</td>
-                        <td>{(m.get('hplc_results')[:30]) if m.get('hplc_results') else 'N/A'}</td>
-                        <td>{m.get('hplc_sample_time').strftime('%Y-%m-%d %H:%M') if m.get('hplc_sample_time') else 'N/A'}</td>
-                        <td>{m.get('scoby_wet_weight') or 'N/A'}</td>
-                        <td>{m.get('scoby_dry_weight') or 'N/A'}</td>
-                        <td>{m.get('notes') or '—'}</td>
-                    </tr>
-                """
-            html += "</tbody></table>"
-    else:
-        html += """
+
+NO_MEASUREMENTS_MESSAGE = """
         <p>No measurement data is available yet. Results will be displayed here once measurements are recorded.</p>
         """
 
-    html += """
+DISCUSSION_AND_CONCLUSION = """
     </div>
 
     <div class="report-section">
@@ -245,10 +136,7 @@ def generate_experiment_html(experiment_title, samples):
     </div>
     """
 
-    # Add notes section if any batch has notes
-    has_notes = any(sample.get('notes') for sample in samples)
-    if has_notes:
-        html += """
+NOTES_SECTION_START = """
         <div class="report-section">
             <p>
             <div class="section-title">Notes and Observations</div>
@@ -256,15 +144,13 @@ def generate_experiment_html(experiment_title, samples):
             
             <div class="notes-section">
         """
-        for sample in samples:
-            if sample.get('notes'):
-                html += f"<p><strong>{sample.get('name')}:</strong> {sample.get('notes')}</p>"
-        html += """
+
+NOTES_SECTION_END = """
             </div>
         </div>
         """
-    else:
-        html += """
+
+NO_NOTES_SECTION = """
         <div class="report-section">
             <div class="section-title">Notes and Observations</div>
             <div class="notes-section">
@@ -273,7 +159,130 @@ def generate_experiment_html(experiment_title, samples):
         </div>
         """
 
-    return html
+def generate_experiment_html(experiment_title, samples, timepoints=None):
+    """
+    Generate HTML content for an experiment with samples
+
+    Args:
+        experiment_title: The title of the experiment
+        samples: A list of sample dictionaries with parameters
+        timepoints: The experiment's timepoints in order (optional). Measurement tables follow
+            this order; without it they are sorted by the number in names like "t4"
+
+    Returns:
+        HTML string for the experiment
+    """
+
+    parts = [REPORT_STYLE, f"""
+    <div class="report-section">
+        <p>
+        <div class="section-title">Abstract</div>
+        <p>
+        <p>
+            This report documents a kombucha fermentation experiment involving {len(samples)} different batches/samples.
+            The experiment investigates the effects of various parameters on kombucha fermentation, including tea type,
+            sugar concentration, and fermentation temperature.
+        </p>
+    </div>
+
+    <div class="report-section">
+        <p>
+        <div class="section-title">Materials and Methods</div>
+        <p>
+        <p>
+            The experiment was conducted using {len(samples)} different batches with varying parameters.
+            Each batch was prepared according to the parameters specified in the table below and monitored
+            throughout the fermentation process. Measurements were taken at specific timepoints to track
+            changes in pH, microbial composition, and metabolite production.
+        </p>
+
+        <p>
+        <div class="section-title">Experimental Setup</div>
+        <p>
+
+""", SETUP_TABLE_HEAD]
+
+    # One pass over the samples: emit the setup rows and collect the
+    # measurements by timepoint and the notes for the later sections
+    has_measurements = False
+    timepoint_groups = defaultdict(list)
+    notes = []
+    for sample in samples:
+        parts.append(f"""
+            <tr>
+                <td>{_esc(sample.get('name', ''))}</td>
+                <td>{_esc(sample.get('tea_type', ''))}</td>
+                <td>{sample.get('tea_concentration', '')} g/L</td>
+                <td>{sample.get('water_amount', '')} mL</td>
+                <td>{_esc(sample.get('sugar_type', ''))}</td>
+                <td>{sample.get('sugar_concentration', '')} g/L</td>
+                <td>{sample.get('inoculum_concentration', '')} %</td>
+                <td>{sample.get('temperature', '')} °C</td>
+                <td>{_esc(sample.get('status', 'Setup'))}</td>
+            </tr>
+        """)
+
+        for m in sample.get('measurements', []):
+            if not has_measurements and (
+                m.get('ph_value') or m.get('micro_results') or m.get('hplc_results') or m.get('scoby_wet_weight')
+            ):
+                has_measurements = True
+            tp = m.get('timepoint')
+            if tp:
+                timepoint_groups[tp].append((sample.get('name'), m))
+
+        if sample.get('notes'):
+            notes.append(f"<p><strong>{_esc(sample.get('name'))}:</strong> {_esc(sample.get('notes'))}</p>")
+
+    parts.append(SETUP_TABLE_END)
+
+    # Only show measurement tables if any sample has data at any timepoint
+    if has_measurements:
+        if timepoints is not None:
+            # Timepoints may share a name; their measurements form a single group
+            ordered_groups = [
+                (name, timepoint_groups[name])
+                for name in dict.fromkeys(tp.name for tp in timepoints)
+                if name in timepoint_groups
+            ]
+        else:
+            ordered_groups = sorted(timepoint_groups.items(), key=lambda x: int(x[0][1:]))
+        for tp_name, entries in ordered_groups:
+            parts.append(f'\n            <h4 style="margin-top: 1em;">Timepoint: {_esc(tp_name)}</h4>\n')
+            parts.append(MEASUREMENT_TABLE_HEAD)
+            for batch_name, m in entries:
+                get = m.get
+                micro = get('micro_results')
+                hplc = get('hplc_results')
+                parts.append(f"""
+                    <tr>
+                        <td>{_esc(batch_name)}</td>
+                        <td>{get('ph_value') or 'N/A'}</td>
+                        <td>{_format_time(get('ph_sample_time'))}</td>
+                        <td>{_esc(micro[:RESULTS_PREVIEW_LENGTH]) if micro else 'N/A'}</td>
+                        <td>{_format_time(get('micro_sample_time'))}</td>
+                        <td>{_esc(hplc[:RESULTS_PREVIEW_LENGTH]) if hplc else 'N/A'}</td>
+                        <td>{_format_time(get('hplc_sample_time'))}</td>
+                        <td>{get('scoby_wet_weight') or 'N/A'}</td>
+                        <td>{get('scoby_dry_weight') or 'N/A'}</td>
+                        <td>{_esc(get('notes')) or '—'}</td>
+                    </tr>
+                """)
+            parts.append("</tbody></table>")
+    else:
+        parts.append(NO_MEASUREMENTS_MESSAGE)
+
+    parts.append(DISCUSSION_AND_CONCLUSION)
+
+    # Add notes section if any batch has notes
+    if notes:
+        parts.append(NOTES_SECTION_START)
+        parts.extend(notes)
+        parts.append(NOTES_SECTION_END)
+    else:
+        parts.append(NO_NOTES_SECTION)
+
+    return ''.join(parts)
 
 # This function is kept for backward compatibility but is no longer used
 # as the application now uses Batch objects instead of Sample objects
@@ -298,40 +307,56 @@ def generate_sample_dict_from_db_sample(sample):
         'temperature': sample.temperature
     }
 
-def generate_batch_dict_from_db_batch(batch, timepoints=None):
+# Batch and measurement fields copied into the report dicts
+BATCH_REPORT_FIELDS = (
+    'name', 'tea_type', 'tea_concentration', 'water_amount', 'sugar_type',
+    'sugar_concentration', 'inoculum_concentration', 'temperature', 'status',
+)
+MEASUREMENT_REPORT_FIELDS = (
+    'ph_value', 'ph_sample_time', 'micro_results', 'micro_sample_time', 'hplc_results',
+    'hplc_sample_time', 'scoby_wet_weight', 'scoby_dry_weight', 'notes', 'completed',
+)
+_get_batch_report_fields = attrgetter(*BATCH_REPORT_FIELDS)
+_get_measurement_report_fields = attrgetter(*MEASUREMENT_REPORT_FIELDS)
+
+def generate_batch_dict_from_db_batch(batch, timepoints=None, measurements_map=None):
     """
-    Convert a Batch object to a dictionary including measurement data for all timepoints.
+    Convert a Batch object (or a row of the batches table) to a dictionary including measurement data for all timepoints.
+    Pass measurements_map (from get_measurements_for_batches) when converting several batches,
+    so the measurements aren't queried one by one.
     """
-    batch_dict = {
-        'name': batch.name,
-        'tea_type': batch.tea_type,
-        'tea_concentration': batch.tea_concentration,
-        'water_amount': batch.water_amount,
-        'sugar_type': batch.sugar_type,
-        'sugar_concentration': batch.sugar_concentration,
-        'inoculum_concentration': batch.inoculum_concentration,
-        'temperature': batch.temperature,
-        'status': batch.status,
-        'measurements': []
-    }
+    batch_dict = dict(zip(BATCH_REPORT_FIELDS, _get_batch_report_fields(batch)))
+    batch_dict['measurements'] = []
 
     if timepoints:
         for tp in timepoints:
-            m = get_batch_measurement(batch.id, tp.id)
+            if measurements_map is not None:
+                m = measurements_map.get((batch.id, tp.id))
+            else:
+                m = get_batch_measurement(batch.id, tp.id)
             if m:
-                measurement_data = {
-                    'timepoint': tp.name,
-                    'ph_value': m.ph_value,
-                    'ph_sample_time': m.ph_sample_time,
-                    'micro_results': m.micro_results,
-                    'micro_sample_time': m.micro_sample_time,
-                    'hplc_results': m.hplc_results,
-                    'hplc_sample_time': m.hplc_sample_time,
-                    'scoby_wet_weight': m.scoby_wet_weight,
-                    'scoby_dry_weight': m.scoby_dry_weight,
-                    'notes': m.notes,
-                    'completed': m.completed
-                }
+                measurement_data = {'timepoint': tp.name}
+                measurement_data.update(zip(MEASUREMENT_REPORT_FIELDS, _get_measurement_report_fields(m)))
                 batch_dict['measurements'].append(measurement_data)
 
-    return batch_dict
\ No newline at end of file
+    return batch_dict
+
+def generate_batch_dicts_bulk(batches, timepoints):
+    """
+    Convert several batches to report dictionaries, fetching all their measurements in one query
+
+    Args:
+        batches: Batch objects (or rows of the batches table)
+        timepoints: The timepoints of the experiment
+
+    Returns:
+        List of batch dictionaries, in the order of batches
+    """
+    measurements_map = get_measurements_for_batches(
+        [batch.id for batch in batches], [tp.id for tp in timepoints],
+        results_length=RESULTS_PREVIEW_LENGTH
+    )
+    return [
+        generate_batch_dict_from_db_batch(batch, timepoints=timepoints, measurements_map=measurements_map)
+        for batch in batches
+    ]
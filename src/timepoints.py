@@ -3,10 +3,13 @@ Functions for managing timepoints and measurements
 """
 
 from nicegui import ui
-from src.database import Experiment, Batch, Timepoint, Measurement, get_session
+from src.database import Experiment, Batch, Timepoint, Measurement, session_scope
 import datetime
 import sqlalchemy as sa
 
+# Names of the mapped measurement columns, for checking which values can be recorded
+MEASUREMENT_COLUMNS = frozenset(attr.key for attr in sa.inspect(Measurement).column_attrs)
+
 async def create_default_timepoints(experiment_id):
     """
     Create default timepoints for an experiment
@@ -24,40 +27,32 @@ async def create_default_timepoints(experiment_id):
         {"name": "t11", "hours": 11, "order": 4, "description": "Final measurements"}
     ]
     
-    session = get_session()
-    try:
-        # Check if timepoints already exist for this experiment
-        existing_timepoints = session.query(Timepoint).filter_by(experiment_id=experiment_id).all()
-        if existing_timepoints:
-            return True
-        
-        # Create default timepoints
-        for tp_data in default_timepoints:
-            timepoint = Timepoint(
-                experiment_id=experiment_id,
-                name=tp_data["name"],
-                hours=tp_data["hours"],
-                description=tp_data["description"],
-                order=tp_data["order"]
+    with session_scope() as session:
+        try:
+            # Check if timepoints already exist for this experiment
+            has_timepoints = session.query(Timepoint.id).filter_by(experiment_id=experiment_id).first() is not None
+            if has_timepoints:
+                return True
+            
+            # Create default timepoints in a single executemany INSERT
+            timepoint_ids = session.scalars(
+                sa.insert(Timepoint).returning(Timepoint.id, sort_by_parameter_order=True),
+                [dict(tp_data, experiment_id=experiment_id) for tp_data in default_timepoints]
+            ).all()
+            
+            # Set the current timepoint to t0 (the first default timepoint)
+            session.execute(
+                sa.update(Experiment)
+                .where(Experiment.id == experiment_id)
+                .values(current_timepoint_id=timepoint_ids[0])
             )
-            session.add(timepoint)
-        
-        # Set the current timepoint to t0
-        experiment = session.query(Experiment).filter_by(id=experiment_id).first()
-        if experiment:
-            session.flush()  # Flush to get timepoint IDs
-            t0 = session.query(Timepoint).filter_by(experiment_id=experiment_id, name="t0").first()
-            if t0:
-                experiment.current_timepoint_id = t0.id
-        
-        session.commit()
-        return True
-    except Exception as e:
-        session.rollback()
-        ui.notify(f"Error creating timepoints: {str(e)}", color='negative')
-        return False
-    finally:
-        session.close()
+            
+            session.commit()
+            return True
+        except Exception as e:
+            session.rollback()
+            ui.notify(f"Error creating timepoints: {str(e)}", color='negative')
+            return False
 
 async def create_custom_timepoint(experiment_id, name, hours, description, order=None):
     """
@@ -73,32 +68,30 @@ async def create_custom_timepoint(experiment_id, name, hours, description, order
     Returns:
         The ID of the created timepoint or None if creation fails
     """
-    session = get_session()
-    try:
-        # Calculate order if not provided
-        if order is None:
-            max_order = session.query(sa.func.max(Timepoint.order)).filter_by(experiment_id=experiment_id).scalar()
-            order = 1 if max_order is None else max_order + 1
-        
-        # Create timepoint
-        timepoint = Timepoint(
-            experiment_id=experiment_id,
-            name=name,
-            hours=hours,
-            description=description,
-            order=order
-        )
-        
-        session.add(timepoint)
-        session.commit()
-        
-        return timepoint.id
-    except Exception as e:
-        session.rollback()
-        ui.notify(f"Error creating timepoint: {str(e)}", color='negative')
-        return None
-    finally:
-        session.close()
+    with session_scope() as session:
+        try:
+            # Calculate order if not provided
+            if order is None:
+                max_order = session.query(sa.func.max(Timepoint.order)).filter_by(experiment_id=experiment_id).scalar()
+                order = 1 if max_order is None else max_order + 1
+            
+            # Create timepoint
+            timepoint = Timepoint(
+                experiment_id=experiment_id,
+                name=name,
+                hours=hours,
+                description=description,
+                order=order
+            )
+            
+            session.add(timepoint)
+            session.commit()
+            
+            return timepoint.id
+        except Exception as e:
+            session.rollback()
+            ui.notify(f"Error creating timepoint: {str(e)}", color='negative')
+            return None
 
 def get_experiment_timepoints(experiment_id):
     """
@@ -110,12 +103,9 @@ def get_experiment_timepoints(experiment_id):
     Returns:
         A list of timepoint objects
     """
-    session = get_session()
-    try:
+    with session_scope() as session:
         timepoints = session.query(Timepoint).filter_by(experiment_id=experiment_id).order_by(Timepoint.order).all()
         return timepoints
-    finally:
-        session.close()
 
 def get_timepoint(timepoint_id):
     """
@@ -127,12 +117,9 @@ def get_timepoint(timepoint_id):
     Returns:
         The timepoint object or None if not found
     """
-    session = get_session()
-    try:
+    with session_scope() as session:
         timepoint = session.query(Timepoint).filter_by(id=timepoint_id).first()
         return timepoint
-    finally:
-        session.close()
 
 async def set_current_timepoint(experiment_id, timepoint_id):
     """
@@ -145,22 +132,20 @@ async def set_current_timepoint(experiment_id, timepoint_id):
     Returns:
         True if update was successful, False otherwise
     """
-    session = get_session()
-    try:
-        experiment = session.query(Experiment).filter_by(id=experiment_id).first()
-        if not experiment:
+    with session_scope() as session:
+        try:
+            experiment = session.query(Experiment).filter_by(id=experiment_id).first()
+            if not experiment:
+                return False
+            
+            experiment.current_timepoint_id = timepoint_id
+            session.commit()
+            
+            return True
+        except Exception as e:
+            session.rollback()
+            ui.notify(f"Error setting current timepoint: {str(e)}", color='negative')
             return False
-        
-        experiment.current_timepoint_id = timepoint_id
-        session.commit()
-        
-        return True
-    except Exception as e:
-        session.rollback()
-        ui.notify(f"Error setting current timepoint: {str(e)}", color='negative')
-        return False
-    finally:
-        session.close()
 
 async def advance_to_next_timepoint(experiment_id):
     """
@@ -172,39 +157,37 @@ async def advance_to_next_timepoint(experiment_id):
     Returns:
         The ID of the new current timepoint or None if there is no next timepoint
     """
-    session = get_session()
-    try:
-        experiment = session.query(Experiment).filter_by(id=experiment_id).first()
-        if not experiment or not experiment.current_timepoint_id:
-            return None
-        
-        current_timepoint = session.query(Timepoint).filter_by(id=experiment.current_timepoint_id).first()
-        if not current_timepoint:
-            return None
-        
-        # Find the next timepoint in the sequence
-        next_timepoint = session.query(Timepoint).filter_by(
-            experiment_id=experiment_id
-        ).filter(
-            Timepoint.order > current_timepoint.order
-        ).order_by(
-            Timepoint.order
-        ).first()
-        
-        if not next_timepoint:
+    with session_scope() as session:
+        try:
+            experiment = session.query(Experiment).filter_by(id=experiment_id).first()
+            if not experiment or not experiment.current_timepoint_id:
+                return None
+            
+            current_timepoint = session.query(Timepoint).filter_by(id=experiment.current_timepoint_id).first()
+            if not current_timepoint:
+                return None
+            
+            # Find the next timepoint in the sequence
+            next_timepoint = session.query(Timepoint).filter_by(
+                experiment_id=experiment_id
+            ).filter(
+                Timepoint.order > current_timepoint.order
+            ).order_by(
+                Timepoint.order
+            ).first()
+            
+            if not next_timepoint:
+                return None
+            
+            # Update the current timepoint
+            experiment.current_timepoint_id = next_timepoint.id
+            session.commit()
+            
+            return next_timepoint.id
+        except Exception as e:
+            session.rollback()
+            ui.notify(f"Error advancing timepoint: {str(e)}", color='negative')
             return None
-        
-        # Update the current timepoint
-        experiment.current_timepoint_id = next_timepoint.id
-        session.commit()
-        
-        return next_timepoint.id
-    except Exception as e:
-        session.rollback()
-        ui.notify(f"Error advancing timepoint: {str(e)}", color='negative')
-        return None
-    finally:
-        session.close()
 
 def is_final_timepoint(timepoint_id):
     """
@@ -216,8 +199,7 @@ def is_final_timepoint(timepoint_id):
     Returns:
         True if it's the final timepoint, False otherwise
     """
-    session = get_session()
-    try:
+    with session_scope() as session:
         timepoint = session.query(Timepoint).filter_by(id=timepoint_id).first()
         if not timepoint:
             return False
@@ -230,8 +212,6 @@ def is_final_timepoint(timepoint_id):
         ).first()
         
         return next_timepoint is None
-    finally:
-        session.close()
 
 async def record_measurement(batch_id, timepoint_id, **values):
     """
@@ -245,36 +225,34 @@ async def record_measurement(batch_id, timepoint_id, **values):
     Returns:
         True if recording was successful, False otherwise
     """
-    session = get_session()
-    try:
-        # Check if a measurement already exists
-        measurement = session.query(Measurement).filter_by(
-            batch_id=batch_id,
-            timepoint_id=timepoint_id
-        ).first()
-        
-        if measurement:
-            # Update existing measurement
-            for key, value in values.items():
-                if hasattr(measurement, key):
-                    setattr(measurement, key, value)
-        else:
-            # Create new measurement
-            measurement = Measurement(
+    with session_scope() as session:
+        try:
+            # Check if a measurement already exists
+            measurement = session.query(Measurement).filter_by(
                 batch_id=batch_id,
-                timepoint_id=timepoint_id,
-                **values
-            )
-            session.add(measurement)
-        
-        session.commit()
-        return True
-    except Exception as e:
-        session.rollback()
-        ui.notify(f"Error recording measurement: {str(e)}", color='negative')
-        return False
-    finally:
-        session.close()
+                timepoint_id=timepoint_id
+            ).first()
+            
+            if measurement:
+                # Update existing measurement
+                for key, value in values.items():
+                    if key in MEASUREMENT_COLUMNS:
+                        setattr(measurement, key, value)
+            else:
+                # Create new measurement
+                measurement = Measurement(
+                    batch_id=batch_id,
+                    timepoint_id=timepoint_id,
+                    **values
+                )
+                session.add(measurement)
+            
+            session.commit()
+            return True
+        except Exception as e:
+            session.rollback()
+            ui.notify(f"Error recording measurement: {str(e)}", color='negative')
+            return False
 
 def get_batch_measurement(batch_id, timepoint_id):
     """
@@ -287,15 +265,44 @@ def get_batch_measurement(batch_id, timepoint_id):
     Returns:
         The measurement object or None if not found
     """
-    session = get_session()
-    try:
+    with session_scope() as session:
         measurement = session.query(Measurement).filter_by(
             batch_id=batch_id,
             timepoint_id=timepoint_id
         ).first()
         return measurement
-    finally:
-        session.close()
+
+def get_measurements_for_batches(batch_ids, timepoint_ids, results_length=None):
+    """
+    Get the measurements of several batches at several timepoints in one query
+    
+    Args:
+        batch_ids: The IDs of the batches
+        timepoint_ids: The IDs of the timepoints
+        results_length: If given, micro and HPLC results are cut to this many characters by the database
+        
+    Returns:
+        A dictionary mapping (batch_id, timepoint_id) to the measurement row
+    """
+    if not batch_ids or not timepoint_ids:
+        return {}
+    
+    columns = Measurement.__table__.c
+    if results_length is not None:
+        columns = [
+            sa.func.substr(column, 1, results_length).label(column.name)
+            if column.name in ('micro_results', 'hplc_results') else column
+            for column in columns
+        ]
+    
+    with session_scope() as session:
+        measurements = session.execute(
+            sa.select(*columns).where(
+                Measurement.batch_id.in_(batch_ids),
+                Measurement.timepoint_id.in_(timepoint_ids)
+            )
+        ).all()
+        return {(m.batch_id, m.timepoint_id): m for m in measurements}
 
 def get_timepoint_measurements(timepoint_id):
     """
@@ -307,12 +314,9 @@ def get_timepoint_measurements(timepoint_id):
     Returns:
         A list of measurement objects
     """
-    session = get_session()
-    try:
+    with session_scope() as session:
         measurements = session.query(Measurement).filter_by(timepoint_id=timepoint_id).all()
         return measurements
-    finally:
-        session.close()
 
 def get_batch_measurements(batch_id):
     """
@@ -324,12 +328,9 @@ def get_batch_measurements(batch_id):
     Returns:
         A list of measurement objects
     """
-    session = get_session()
-    try:
+    with session_scope() as session:
         measurements = session.query(Measurement).filter_by(batch_id=batch_id).all()
         return measurements
-    finally:
-        session.close()
 
 async def mark_measurement_completed(batch_id, timepoint_id, completed=True):
     """
@@ -343,32 +344,52 @@ async def mark_measurement_completed(batch_id, timepoint_id, completed=True):
     Returns:
         True if update was successful, False otherwise
     """
-    session = get_session()
-    try:
-        measurement = session.query(Measurement).filter_by(
-            batch_id=batch_id,
-            timepoint_id=timepoint_id
-        ).first()
-        
-        if not measurement:
-            # Create a new measurement record if it doesn't exist
-            measurement = Measurement(
+    with session_scope() as session:
+        try:
+            measurement = session.query(Measurement).filter_by(
                 batch_id=batch_id,
-                timepoint_id=timepoint_id,
-                completed=completed
-            )
-            session.add(measurement)
-        else:
-            measurement.completed = completed
-        
-        session.commit()
-        return True
-    except Exception as e:
-        session.rollback()
-        ui.notify(f"Error marking measurement: {str(e)}", color='negative')
-        return False
-    finally:
-        session.close()
+                timepoint_id=timepoint_id
+            ).first()
+            
+            if not measurement:
+                # Create a new measurement record if it doesn't exist
+                measurement = Measurement(
+                    batch_id=batch_id,
+                    timepoint_id=timepoint_id,
+                    completed=completed
+                )
+                session.add(measurement)
+            else:
+                measurement.completed = completed
+            
+            session.commit()
+            return True
+        except Exception as e:
+            session.rollback()
+            ui.notify(f"Error marking measurement: {str(e)}", color='negative')
+            return False
+
+def _timepoint_completion_counts():
+    """
+    Select each timepoint's number of batches and how many of them have a completed measurement
+    there. Timepoints of experiments without batches have no row.
+    """
+    return (
+        sa.select(
+            Timepoint.id,
+            sa.func.count(sa.distinct(Batch.id)).label('total'),
+            sa.func.count(sa.distinct(
+                sa.case((Measurement.completed.is_(True), Batch.id))
+            )).label('completed')
+        )
+        .select_from(Timepoint)
+        .join(Batch, Batch.experiment_id == Timepoint.experiment_id)
+        .outerjoin(Measurement, sa.and_(
+            Measurement.batch_id == Batch.id,
+            Measurement.timepoint_id == Timepoint.id
+        ))
+        .group_by(Timepoint.id)
+    )
 
 def is_timepoint_completed(timepoint_id):
     """
@@ -380,125 +401,84 @@ def is_timepoint_completed(timepoint_id):
     Returns:
         True if all measurements are completed, False otherwise
     """
-    session = get_session()
-    try:
-        timepoint = session.query(Timepoint).filter_by(id=timepoint_id).first()
-        if not timepoint:
-            return False
-        
-        # Get all batches for this experiment
-        batches = session.query(Batch).filter_by(experiment_id=timepoint.experiment_id).all()
-        if not batches:
-            return False
-        
-        # Check if all batches have completed measurements for this timepoint
-        for batch in batches:
-            measurement = session.query(Measurement).filter_by(
-                batch_id=batch.id,
-                timepoint_id=timepoint_id
-            ).first()
-            
-            if not measurement or not measurement.completed:
-                return False
-        
-        return True
-    finally:
-        session.close()
+    with session_scope() as session:
+        # One query instead of one per batch
+        counts = session.execute(
+            _timepoint_completion_counts().where(Timepoint.id == timepoint_id)
+        ).first()
+        return counts is not None and counts.total == counts.completed
 
-async def mark_all_batches_completed(timepoint_id):
+def get_completed_timepoint_ids(experiment_id):
     """
-    Mark all batches as completed for a specific timepoint
+    Get the timepoints of an experiment at which all batches are completed
     
     Args:
-        timepoint_id: The ID of the timepoint
+        experiment_id: The ID of the experiment
         
     Returns:
-        True if update was successful, False otherwise
+        A set of timepoint IDs
     """
-    session = get_session()
-    try:
-        # Find all batches for the experiment of this timepoint
-        timepoint = session.query(Timepoint).filter_by(id=timepoint_id).first()
-        if not timepoint:
-            return False
-        
-        experiment_id = timepoint.experiment_id
-        batches = session.query(Batch).filter_by(experiment_id=experiment_id).all()
-        
-        # Mark all batches as completed for this timepoint
-        success = True
-        for batch in batches:
-            try:
-                measurement = session.query(Measurement).filter_by(
-                    batch_id=batch.id,
-                    timepoint_id=timepoint_id
-                ).first()
-                
-                if not measurement:
-                    # Create a new measurement record if it doesn't exist
-                    measurement = Measurement(
-                        batch_id=batch.id,
-                        timepoint_id=timepoint_id,
-                        completed=True
-                    )
-                    session.add(measurement)
-                else:
-                    measurement.completed = True
-            except Exception as e:
-                success = False
-                ui.notify(f"Error updating batch {batch.name}: {str(e)}", color='negative')
-        
-        session.commit()
-        return success
-    except Exception as e:
-        session.rollback()
-        ui.notify(f"Error marking all batches as completed: {str(e)}", color='negative')
-        return False
-    finally:
-        session.close()
+    with session_scope() as session:
+        counts = session.execute(
+            _timepoint_completion_counts().where(Timepoint.experiment_id == experiment_id)
+        ).all()
+        return {row.id for row in counts if row.total == row.completed}
 
-def get_experiment_measurements_matrix(experiment_id):
+async def mark_all_batches_completed(timepoint_id):
     """
-    Get all measurements for an experiment organized as a matrix of timepoints and batches
+    Mark all batches as completed for a specific timepoint
     
     Args:
-        experiment_id: The ID of the experiment
+        timepoint_id: The ID of the timepoint
         
     Returns:
-        A dictionary with timepoints as keys and dictionary of batch measurements as values
+        True if update was successful, False otherwise
     """
-    session = get_session()
-    try:
-        # Get timepoints for this experiment
-        timepoints = get_experiment_timepoints(experiment_id)
-        
-        # Get batches for this experiment
-        batches = session.query(Batch).filter_by(experiment_id=experiment_id).all()
-        
-        # Create measurements matrix
-        measurements_matrix = {}
-        
-        for timepoint in timepoints:
-            measurements_matrix[timepoint.id] = {
-                'timepoint': timepoint,
-                'batches': {}
-            }
+    with session_scope() as session:
+        try:
+            # Find all batches for the experiment of this timepoint
+            timepoint = session.query(Timepoint).filter_by(id=timepoint_id).first()
+            if not timepoint:
+                return False
             
-            for batch in batches:
-                # Get measurement for this batch at this timepoint
-                measurement = session.query(Measurement).filter_by(
-                    batch_id=batch.id,
-                    timepoint_id=timepoint.id
-                ).first()
-                
-                measurements_matrix[timepoint.id]['batches'][batch.id] = {
-                    'batch': batch,
-                    'measurement': measurement
-                }
-        
-        return measurements_matrix
-    finally:
-        session.close()
+            experiment_id = timepoint.experiment_id
+            batch_ids = session.scalars(
+                sa.select(Batch.id).where(Batch.experiment_id == experiment_id)
+            ).all()
+            measured_batch_ids = set(session.scalars(
+                sa.select(Measurement.batch_id).where(Measurement.timepoint_id == timepoint_id)
+            ))
+            
+            # Mark existing measurements as completed in one statement
+            session.execute(
+                sa.update(Measurement)
+                .where(Measurement.timepoint_id == timepoint_id, Measurement.completed.isnot(True))
+                .values(completed=True)
+            )
+            
+            # Create completed measurement records for batches that have none yet,
+            # as one bulk insert rather than an ORM object per batch
+            new_rows = [
+                {'batch_id': batch_id, 'timepoint_id': timepoint_id, 'completed': True}
+                for batch_id in batch_ids
+                if batch_id not in measured_batch_ids
+            ]
+            if new_rows:
+                session.execute(sa.insert(Measurement), new_rows)
+            
+            # Bulk UPDATEs don't go through the flush, so touch the experiment explicitly
+            session.execute(
+                sa.update(Experiment)
+                .where(Experiment.id == experiment_id)
+                .values(updated_at=datetime.datetime.utcnow())
+            )
+            
+            session.commit()
+            return True
+        except Exception as e:
+            session.rollback()
+            ui.notify(f"Error marking all batches as completed: {str(e)}", color='negative')
+            return False
 
 def create_timepoint_config_ui(experiment_id):
     """
@@ -574,36 +554,34 @@ async def delete_timepoint(timepoint_id):
     Returns:
         True if deletion was successful, False otherwise
     """
-    session = get_session()
-    try:
-        # Check if this timepoint is currently set as current for any experiment
-        experiment = session.query(Experiment).filter_by(current_timepoint_id=timepoint_id).first()
-        if experiment:
-            ui.notify('Cannot delete a timepoint that is currently active', color='negative')
+    with session_scope() as session:
+        try:
+            # Check if this timepoint is currently set as current for any experiment
+            experiment = session.query(Experiment).filter_by(current_timepoint_id=timepoint_id).first()
+            if experiment:
+                ui.notify('Cannot delete a timepoint that is currently active', color='negative')
+                return False
+            
+            # Check if there are any measurements for this timepoint
+            measurements = session.query(Measurement).filter_by(timepoint_id=timepoint_id).all()
+            if measurements:
+                ui.notify('Cannot delete a timepoint that has measurements', color='negative')
+                return False
+            
+            # Delete the timepoint
+            timepoint = session.query(Timepoint).filter_by(id=timepoint_id).first()
+            if timepoint:
+                session.delete(timepoint)
+                session.commit()
+                ui.notify('Timepoint deleted successfully', color='positive')
+                ui.run_javascript("window.location.reload()")
+                return True
+            
             return False
-        
-        # Check if there are any measurements for this timepoint
-        measurements = session.query(Measurement).filter_by(timepoint_id=timepoint_id).all()
-        if measurements:
-            ui.notify('Cannot delete a timepoint that has measurements', color='negative')
+        except Exception as e:
+            session.rollback()
+            ui.notify(f"Error deleting timepoint: {str(e)}", color='negative')
             return False
-        
-        # Delete the timepoint
-        timepoint = session.query(Timepoint).filter_by(id=timepoint_id).first()
-        if timepoint:
-            session.delete(timepoint)
-            session.commit()
-            ui.notify('Timepoint deleted successfully', color='positive')
-            ui.run_javascript("window.location.reload()")
-            return True
-        
-        return False
-    except Exception as e:
-        session.rollback()
-        ui.notify(f"Error deleting timepoint: {str(e)}", color='negative')
-        return False
-    finally:
-        session.close()
 
 def create_timepoint_workflow_ui(experiment_id):
     """
@@ -612,7 +590,8 @@ def create_timepoint_workflow_ui(experiment_id):
     Args:
         experiment_id: The ID of the experiment
     """
-    experiment = get_session().query(Experiment).filter_by(id=experiment_id).first()
+    with session_scope() as session:
+        experiment = session.query(Experiment).filter_by(id=experiment_id).first()
     if not experiment:
         ui.label('Experiment not found').classes('text-xl text-red-500')
         return
@@ -622,18 +601,20 @@ def create_timepoint_workflow_ui(experiment_id):
     if experiment.current_timepoint_id:
         current_timepoint = get_timepoint(experiment.current_timepoint_id)
     
-    # Get all timepoints
+    # Get all timepoints, and which of them are completed
     timepoints = get_experiment_timepoints(experiment_id)
+    completed_timepoint_ids = get_completed_timepoint_ids(experiment_id)
     
     # Get all batches
-    batches = get_session().query(Batch).filter_by(experiment_id=experiment_id).all()
+    with session_scope() as session:
+        batches = session.query(Batch).filter_by(experiment_id=experiment_id).all()
     with ui.card().classes('w-full'):
         # Card header with title and measurements overview button
         with ui.row().classes('w-full flex justify-between items-center'):
             ui.label('Workflow Tracking').classes('text-xl font-bold')
             ui.button(
                 'View Measurements Overview', 
-                on_click=lambda: ui.run_javascript(f"window.location.href = '/experiment/{experiment_id}/overview'"),
+                on_click=lambda: ui.navigate.to(f'/experiment/{experiment_id}/overview'),
                 color='amber'
             ).classes('ml-auto')
         
@@ -642,7 +623,7 @@ def create_timepoint_workflow_ui(experiment_id):
             for i, tp in enumerate(timepoints):
                 # Timepoint circle
                 is_current = current_timepoint and tp.id == current_timepoint.id
-                is_completed = is_timepoint_completed(tp.id)
+                is_completed = tp.id in completed_timepoint_ids
                 
                 circle_color = 'bg-green-500' if is_completed else ('bg-blue-500' if is_current else 'bg-gray-300')
                 with ui.element('div').classes(f'rounded-full {circle_color} w-8 h-8 flex items-center justify-center text-white'):
@@ -664,6 +645,14 @@ def create_timepoint_workflow_ui(experiment_id):
             ui.label(f'Current Timepoint: {current_timepoint.name} ({current_timepoint.hours}h)').classes('text-lg font-bold mt-4')
             ui.label(current_timepoint.description).classes('text-gray-600')
 
+            # Timepoints are ordered, so the current one is final if none comes after it
+            is_final = current_timepoint.order >= timepoints[-1].order
+            all_completed = current_timepoint.id in completed_timepoint_ids
+            # Measurements of all batches at the current timepoint, for the table and the batch cards
+            measurements = get_measurements_for_batches(
+                [batch.id for batch in batches], [current_timepoint.id]
+            )
+
             # --- Timepoint Navigation Buttons ---
             previous_tp = None
             next_tp = None
@@ -719,7 +708,7 @@ def create_timepoint_workflow_ui(experiment_id):
                 ]
                 
                 # Add SCOBY columns if this is the final timepoint
-                if is_final_timepoint(current_timepoint.id):
+                if is_final:
                     columns.extend([
                         {'name': 'scoby_wet', 'label': 'SCOBY Wet', 'field': 'scoby_wet'},
                         {'name': 'scoby_dry', 'label': 'SCOBY Dry', 'field': 'scoby_dry'},
@@ -733,7 +722,7 @@ def create_timepoint_workflow_ui(experiment_id):
                 # Prepare rows data
                 rows = []
                 for batch in batches:
-                    measurement = get_batch_measurement(batch.id, current_timepoint.id)
+                    measurement = measurements.get((batch.id, current_timepoint.id))
                     
                     # Determine status
                     status = "Not Started"
@@ -769,7 +758,7 @@ def create_timepoint_workflow_ui(experiment_id):
                     }
                     
                     # Add SCOBY data if this is the final timepoint
-                    if is_final_timepoint(current_timepoint.id):
+                    if is_final:
                         row['scoby_wet'] = str(measurement.scoby_wet_weight) if measurement and measurement.scoby_wet_weight else "N/A"
                         row['scoby_dry'] = str(measurement.scoby_dry_weight) if measurement and measurement.scoby_dry_weight else "N/A"
                     
@@ -796,7 +785,7 @@ def create_timepoint_workflow_ui(experiment_id):
                             ui.label(batch.name).classes('font-bold text-center')
                             
                             # Get measurement for this batch
-                            measurement = get_batch_measurement(batch.id, current_timepoint.id)
+                            measurement = measurements.get((batch.id, current_timepoint.id))
                             
                             # Sample collection button
                             with ui.row().classes('w-full justify-center mt-2'):
@@ -883,10 +872,9 @@ def create_timepoint_workflow_ui(experiment_id):
                             with ui.element('div').classes('w-full grid grid-cols-1 sm:grid-cols-3 gap-2 mt-2'):                                # pH Button
                                 async def record_ph(b_id=batch.id, t_id=current_timepoint.id):
                                     # Get correct batch name from ID
-                                    session = get_session()
-                                    batch_obj = session.query(Batch).filter_by(id=b_id).first()
-                                    batch_name = batch_obj.name if batch_obj else "Unknown Batch"
-                                    session.close()
+                                    with session_scope() as session:
+                                        batch_obj = session.query(Batch).filter_by(id=b_id).first()
+                                        batch_name = batch_obj.name if batch_obj else "Unknown Batch"
                                     
                                     # Declare the dialog in outer scope to close it later
                                     ph_dialog = ui.dialog()
@@ -934,10 +922,9 @@ def create_timepoint_workflow_ui(experiment_id):
                                 # Micro Button
                                 async def record_micro(b_id=batch.id, t_id=current_timepoint.id):
                                     # Get correct batch name from ID
-                                    session = get_session()
-                                    batch_obj = session.query(Batch).filter_by(id=b_id).first()
-                                    batch_name = batch_obj.name if batch_obj else "Unknown Batch"
-                                    session.close()
+                                    with session_scope() as session:
+                                        batch_obj = session.query(Batch).filter_by(id=b_id).first()
+                                        batch_name = batch_obj.name if batch_obj else "Unknown Batch"
                                     
                                     # Open a simple dialog to enter micro results
                                     with ui.dialog() as micro_dialog, ui.card():
@@ -977,10 +964,9 @@ def create_timepoint_workflow_ui(experiment_id):
                                 # HPLC Button
                                 async def record_hplc(b_id=batch.id, t_id=current_timepoint.id):
                                     # Get correct batch name from ID
-                                    session = get_session()
-                                    batch_obj = session.query(Batch).filter_by(id=b_id).first()
-                                    batch_name = batch_obj.name if batch_obj else "Unknown Batch"
-                                    session.close()
+                                    with session_scope() as session:
+                                        batch_obj = session.query(Batch).filter_by(id=b_id).first()
+                                        batch_name = batch_obj.name if batch_obj else "Unknown Batch"
                                     
                                     # Open a simple dialog to enter HPLC results
                                     with ui.dialog() as hplc_dialog, ui.card():
@@ -1018,15 +1004,14 @@ def create_timepoint_workflow_ui(experiment_id):
                                 ).classes(f'text-white w-full')
 
                             # SCOBY weights (only for final timepoint)
-                            if is_final_timepoint(current_timepoint.id):
+                            if is_final:
                                 ui.separator().classes('my-2')
                                 ui.label('SCOBY Weights:').classes('text-center mt-2')
                                 async def record_scoby(b_id=batch.id, t_id=current_timepoint.id):
                                     # Get correct batch name from ID
-                                    session = get_session()
-                                    batch_obj = session.query(Batch).filter_by(id=b_id).first()
-                                    batch_name = batch_obj.name if batch_obj else "Unknown Batch"
-                                    session.close()
+                                    with session_scope() as session:
+                                        batch_obj = session.query(Batch).filter_by(id=b_id).first()
+                                        batch_name = batch_obj.name if batch_obj else "Unknown Batch"
                                     
                                     # Open a simple dialog to enter SCOBY weights
                                     with ui.dialog() as scoby_dialog, ui.card():
@@ -1090,8 +1075,6 @@ def create_timepoint_workflow_ui(experiment_id):
                             ).classes('bg-gray-500 text-white w-full mt-2')              # Complete All button
             
 
-            all_completed = is_timepoint_completed(current_timepoint.id)
-            
             if not all_completed:
                 with ui.element('div').classes('w-full mt-4 mb-4'):
                     async def complete_all_batches():
@@ -1111,28 +1094,27 @@ def create_timepoint_workflow_ui(experiment_id):
                 
               # Timepoint navigation buttons - full width on mobile
             with ui.element('div').classes('w-full mt-4'):
-                # Check if all measurements are completed
-                all_completed = is_timepoint_completed(current_timepoint.id)
-                
                 # Only show advance button if all measurements are completed
                 if all_completed:
                     # Check if this is the final timepoint
-                    if is_final_timepoint(current_timepoint.id):
+                    if is_final:
                         async def complete_experiment():
                             # Update experiment status to Completed
-                            session = get_session()
-                            try:
-                                experiment = session.query(Experiment).filter_by(id=experiment_id).first()
-                                if experiment:
-                                    experiment.status = "Completed"
-                                    session.commit()
-                                    ui.notify('Experiment completed', color='positive')
-                                    ui.run_javascript(f"window.location.href = '/experiment/{experiment_id}'")
-                            except Exception as e:
-                                session.rollback()
-                                ui.notify(f"Error completing experiment: {str(e)}", color='negative')
-                            finally:
-                                session.close()
+                            with session_scope() as session:
+                                try:
+                                    # One UPDATE; the updated_at column is bumped by its onupdate
+                                    result = session.execute(
+                                        sa.update(Experiment)
+                                        .where(Experiment.id == experiment_id)
+                                        .values(status="Completed")
+                                    )
+                                    if result.rowcount:
+                                        session.commit()
+                                        ui.notify('Experiment completed', color='positive')
+                                        ui.navigate.to(f'/experiment/{experiment_id}')
+                                except Exception as e:
+                                    session.rollback()
+                                    ui.notify(f"Error completing experiment: {str(e)}", color='negative')
                         
                         # Full width button on mobile
                         ui.button('Complete Experiment',
@@ -1163,25 +1145,25 @@ def create_timepoint_workflow_ui(experiment_id):
                     return
                 
                 # Get the first timepoint
-                session = get_session()
-                try:
-                    t0 = session.query(Timepoint).filter_by(experiment_id=experiment_id, name="t0").first()
-                    if t0:
-                        # Set as current timepoint
-                        experiment = session.query(Experiment).filter_by(id=experiment_id).first()
-                        if experiment:
-                            experiment.current_timepoint_id = t0.id
-                            experiment.status = "Running"
-                            session.commit()
-                            ui.notify('Workflow started', color='positive')
-                            ui.run_javascript("window.location.reload()")
-                    else:
-                        ui.notify('Failed to find t0 timepoint', color='negative')
-                except Exception as e:
-                    session.rollback()
-                    ui.notify(f"Error starting workflow: {str(e)}", color='negative')
-                finally:
-                    session.close()
+                with session_scope() as session:
+                    try:
+                        t0 = session.query(Timepoint).filter_by(experiment_id=experiment_id, name="t0").first()
+                        if t0:
+                            # Set as current timepoint
+                            result = session.execute(
+                                sa.update(Experiment)
+                                .where(Experiment.id == experiment_id)
+                                .values(current_timepoint_id=t0.id, status="Running")
+                            )
+                            if result.rowcount:
+                                session.commit()
+                                ui.notify('Workflow started', color='positive')
+                                ui.run_javascript("window.location.reload()")
+                        else:
+                            ui.notify('Failed to find t0 timepoint', color='negative')
+                    except Exception as e:
+                        session.rollback()
+                        ui.notify(f"Error starting workflow: {str(e)}", color='negative')
             
             ui.button('Start Workflow', on_click=start_workflow).classes('bg-blue-500 text-white w-full')
 
@@ -1193,7 +1175,8 @@ def open_measurement_dialog(batch_id, timepoint_id):
         batch_id: The ID of the batch
         timepoint_id: The ID of the timepoint
     """
-    batch = get_session().query(Batch).filter_by(id=batch_id).first()
+    with session_scope() as session:
+        batch = session.query(Batch).filter_by(id=batch_id).first()
     timepoint = get_timepoint(timepoint_id)
     
     if not batch or not timepoint:
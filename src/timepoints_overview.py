@@ -3,8 +3,10 @@ Functions for displaying the timepoint measurements overview
 """
 
 from nicegui import ui
-from src.database import Experiment, Batch, Timepoint, Measurement, get_session
-from src.timepoints import get_experiment_timepoints, get_batch_measurement, record_measurement, mark_measurement_completed, is_final_timepoint
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from src.database import Experiment, Batch, Timepoint, get_session
+from src.timepoints import get_experiment_timepoints, get_batch_measurement, record_measurement, mark_measurement_completed
 import datetime
 
 def get_experiment_measurements_matrix(experiment_id):
@@ -22,8 +24,17 @@ def get_experiment_measurements_matrix(experiment_id):
         # Get timepoints for this experiment
         timepoints = get_experiment_timepoints(experiment_id)
         
-        # Get batches for this experiment
-        batches = session.query(Batch).filter_by(experiment_id=experiment_id).all()
+        # Get batches for this experiment, with all their measurements loaded
+        # in one extra query instead of one query per batch and timepoint
+        batches = session.scalars(
+            select(Batch)
+            .where(Batch.experiment_id == experiment_id)
+            .options(selectinload(Batch.measurements))
+        ).all()
+        batch_measurements = {
+            batch.id: {m.timepoint_id: m for m in batch.measurements}
+            for batch in batches
+        }
         
         # Create measurements matrix
         measurements_matrix = {}
@@ -35,15 +46,9 @@ def get_experiment_measurements_matrix(experiment_id):
             }
             
             for batch in batches:
-                # Get measurement for this batch at this timepoint
-                measurement = session.query(Measurement).filter_by(
-                    batch_id=batch.id,
-                    timepoint_id=timepoint.id
-                ).first()
-                
                 measurements_matrix[timepoint.id]['batches'][batch.id] = {
                     'batch': batch,
-                    'measurement': measurement
+                    'measurement': batch_measurements[batch.id].get(timepoint.id)
                 }
         
         return measurements_matrix, timepoints, batches
@@ -91,7 +96,7 @@ def create_measurements_overview_ui(experiment_id):
                     ui.label(batch.name).classes('font-bold')
                     
                     for timepoint in timepoints:
-                        measurement = get_batch_measurement(batch.id, timepoint.id)
+                        measurement = measurements_matrix[timepoint.id]['batches'][batch.id]['measurement']
                         ph_value = measurement.ph_value if measurement and measurement.ph_value is not None else None
                         
                         # Create an editable cell
@@ -141,7 +146,7 @@ def create_measurements_overview_ui(experiment_id):
                     ui.label(batch.name).classes('font-bold')
                     
                     for timepoint in timepoints:
-                        measurement = get_batch_measurement(batch.id, timepoint.id)
+                        measurement = measurements_matrix[timepoint.id]['batches'][batch.id]['measurement']
                         micro_results = measurement.micro_results if measurement and measurement.micro_results else ""
                         has_results = bool(micro_results)
                         
@@ -212,7 +217,7 @@ def create_measurements_overview_ui(experiment_id):
                     ui.label(batch.name).classes('font-bold')
                     
                     for timepoint in timepoints:
-                        measurement = get_batch_measurement(batch.id, timepoint.id)
+                        measurement = measurements_matrix[timepoint.id]['batches'][batch.id]['measurement']
                         hplc_results = measurement.hplc_results if measurement and measurement.hplc_results else ""
                         has_results = bool(hplc_results)
                         
@@ -283,7 +288,7 @@ def create_measurements_overview_ui(experiment_id):
                     ui.label(batch.name).classes('font-bold')
                     
                     for timepoint in timepoints:
-                        measurement = get_batch_measurement(batch.id, timepoint.id)
+                        measurement = measurements_matrix[timepoint.id]['batches'][batch.id]['measurement']
                         completed = measurement and measurement.completed
                         
                         # Create a cell with completion toggle
@@ -306,8 +311,9 @@ def create_measurements_overview_ui(experiment_id):
                                    ).classes('ml-4')
         
         # SCOBY Weights section (only shown for final timepoints)
-        # Check if any timepoint is a final timepoint
-        has_final_timepoint = any(is_final_timepoint(tp.id) for tp in timepoints)
+        # Timepoints are ordered, so the final ones are those with the last order
+        final_order = timepoints[-1].order if timepoints else None
+        has_final_timepoint = final_order is not None
         
         if has_final_timepoint:
             ui.label('SCOBY Weights').classes('text-lg font-bold mt-6')
@@ -318,7 +324,7 @@ def create_measurements_overview_ui(experiment_id):
                     # Header row
                     ui.label('Batch/Timepoint').classes('font-bold')
                     for timepoint in timepoints:
-                        is_final = is_final_timepoint(timepoint.id)
+                        is_final = timepoint.order >= final_order
                         label_text = f"{timepoint.name} ({timepoint.hours}h)"
                         if is_final:
                             label_text += " (Final)"
@@ -329,8 +335,8 @@ def create_measurements_overview_ui(experiment_id):
                         ui.label(batch.name).classes('font-bold')
                         
                         for timepoint in timepoints:
-                            measurement = get_batch_measurement(batch.id, timepoint.id)
-                            is_final = is_final_timepoint(timepoint.id)
+                            measurement = measurements_matrix[timepoint.id]['batches'][batch.id]['measurement']
+                            is_final = timepoint.order >= final_order
                             
                             # Capture batch_id and timepoint_id for lambda functions
                             b_id = batch.id
@@ -410,7 +416,7 @@ def create_measurements_overview_ui(experiment_id):
         
         # Navigation buttons
         with ui.row().classes('w-full justify-between mt-8'):
-            ui.button('Back to Experiment', on_click=lambda: ui.run_javascript(f"window.location.href = '/experiment/{experiment_id}'"),
+            ui.button('Back to Experiment', on_click=lambda: ui.navigate.to(f'/experiment/{experiment_id}'),
                       color='blue').classes('mr-2')
-            ui.button('Go to Workflow', on_click=lambda: ui.run_javascript(f"window.location.href = '/experiment/{experiment_id}/workflow'"), 
+            ui.button('Go to Workflow', on_click=lambda: ui.navigate.to(f'/experiment/{experiment_id}/workflow'), 
                       color='purple')